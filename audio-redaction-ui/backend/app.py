@@ -1,59 +1,397 @@
-from flask import Flask, request, jsonify
-from datetime import datetime
-from conversation_highlight import generate_transcript
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
+import repo_root
+import metrics
+from highlight_store import HighlightStore
+from jobs import FINISHED, JobQueue, QueueFull, SpooledOutput
 from redaction import (
-    redact_mp3_by_words, 
-    redact_mp3_by_single_words
+    RedactionPreview,
+    check_redaction_options,
+    redact_audio_segment,
+    redaction_points_for
 )
 app = Flask(__name__)
 CORS(app)
 
-INPUT_AUDIO = "/Users/granthu/VC Prototype/vc/audio-redaction-ui/frontend/src/data/highlight-5300643.mp3"
-INPUT_JSON = "/Users/granthu/VC Prototype/vc/audio-redaction-ui/frontend/src/data/conversation-5300643.json"
+# directories searched for highlight-<id>.mp3 and conversation-<id>.json,
+# set VC_HIGHLIGHT_DIRS to a os.pathsep separated list to search others
+HIGHLIGHT_DIRS = [os.path.join(repo_root.ROOT, "audio-redaction-ui",
+                               "frontend", "src", "data"),
+                  os.path.join(repo_root.ROOT, "conversations"),
+                  os.path.join(repo_root.ROOT, "testing")]
+if os.environ.get("VC_HIGHLIGHT_DIRS"):
+    HIGHLIGHT_DIRS = os.environ["VC_HIGHLIGHT_DIRS"].split(os.pathsep)
+# redacted audio stays in memory up to this size, then spills to disk
+MAX_OUTPUT_MEMORY = 16 * 1024 ** 2
+# highlight of the endpoints that don't take an ID
+HIGHLIGHT_ID = "5300643"
+HIGHLIGHTS = HighlightStore(HIGHLIGHT_DIRS)
+
+# redactions run in the background, requests only submit and poll them
+REDACTION_WORKERS = 4
+MAX_PENDING_REDACTIONS = 32
+JOBS = JobQueue(workers=REDACTION_WORKERS,
+                max_pending=MAX_PENDING_REDACTIONS)
+
+# live previews of the redaction UI, by (highlight ID, session)
+MAX_PREVIEWS = 16
+PREVIEWS = OrderedDict()
+PREVIEWS_LOCK = threading.Lock()
+
+def _byte_response(size, read, etag, mimetype, cache_control="no-cache"):
+    """
+    Streams bytes with support for Range and If-None-Match requests.
+
+    Args:
+        size (int): total size in bytes
+        read (function): read(start, stop) returning an iterable of bytes
+        etag (String): quoted entity tag of the bytes
+        mimetype (String): content type of the bytes
+        cache_control (String): Cache-Control header
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control,
+               "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+    byte_range = request.range.range_for_length(size) \
+        if request.range else None
+    if request.range and byte_range is None:
+        return Response(status=416,
+                        headers={"Content-Range": f"bytes */{size}"})
+    start, stop = byte_range or (0, size)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    headers["Content-Length"] = str(stop - start)
+    return Response(read(start, stop), status=206 if byte_range else 200,
+                    mimetype=mimetype, headers=headers)
+
+
+def _json_body():
+    """
+    Returns the JSON object of the request, None if the body is missing or
+    not an object.
+    """
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def _highlight_or_404(highlight_id):
+    try:
+        return HIGHLIGHTS.get(highlight_id), None
+    except KeyError:
+        return None, (jsonify(
+            {"error": f"Unknown highlight: {highlight_id}"}), 404)
+
+
+def _cached_payload(highlight, name):
+    """
+    Answers with a payload rendered when the highlight was parsed, or with
+    304 if the client already has it.
+    """
+    etag = highlight.etags[name]
+    if etag in request.headers.get("If-None-Match", ""):
+        response = Response(status=304)
+    else:
+        response = Response(highlight.payloads[name],
+                            mimetype="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.prometheus_text(),
+                    mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/api/metrics', methods=['GET'])
+def json_metrics():
+    return jsonify(metrics.snapshot())
+
+
+@app.route('/api/highlights', methods=['GET'])
+def list_highlights():
+    return jsonify({"highlights": HIGHLIGHTS.ids()})
+
+
+@app.route('/api/highlights/<highlight_id>/transcript', methods=['GET'])
+def highlight_transcript(highlight_id):
+    highlight, error = _highlight_or_404(highlight_id)
+    if error:
+        return error
+    return _cached_payload(highlight, "transcript")
+
+
+@app.route('/api/highlights/<highlight_id>/words', methods=['GET'])
+def highlight_words(highlight_id):
+    highlight, error = _highlight_or_404(highlight_id)
+    if error:
+        return error
+    return _cached_payload(highlight, "words")
+
+
+@app.route('/api/highlights/<highlight_id>/audio', methods=['GET'])
+def highlight_audio(highlight_id):
+    highlight, error = _highlight_or_404(highlight_id)
+    if error:
+        return error
+    # send_file answers If-None-Match and Range requests itself
+    return send_file(highlight.audio_path, mimetype="audio/mpeg",
+                     conditional=True, etag=True, max_age=0)
+
 
 # Endpoint to serve the transcript
 @app.route('/api/transcript', methods=['GET'])
 def get_transcript():
-    transcript = generate_transcript(INPUT_JSON)
-    print(transcript)
-    return jsonify({"transcript": transcript})
+    return highlight_transcript(HIGHLIGHT_ID)
 
 # Endpoint to process JSON metadata and extract transcript
 @app.route('/extract-transcript', methods=['POST'])
 def extract_transcript_api():
-    # Get the JSON data from the request
-    
-    # Extract transcript using your conversion script
-    transcript = generate_transcript(INPUT_JSON)
-    
-    # Return the transcript as JSON
-    return jsonify({"transcript": transcript})
+    return highlight_transcript(HIGHLIGHT_ID)
+
+
+def _get_preview(highlight_id, session):
+    with PREVIEWS_LOCK:
+        entry = PREVIEWS.get((highlight_id, session))
+        if entry is not None:
+            PREVIEWS.move_to_end((highlight_id, session))
+        return entry
+
+
+@app.route('/api/highlights/<highlight_id>/preview', methods=['PUT'])
+def update_preview(highlight_id):
+    """
+    Sets the redactions of a preview session, creating the session on
+    first use. Only intervals that changed since the last update are
+    re-rendered.
+    """
+    highlight, error = _highlight_or_404(highlight_id)
+    if error:
+        return error
+    data = _json_body()
+    if data is None:
+        return jsonify({"error": "Expected a JSON object"}), 400
+    words = data.get("words", [])
+    if not isinstance(words, list):
+        return jsonify({"error": "words must be a list"}), 400
+    redact_freq = data.get("freq", 1000)
+    mode = data.get("mode", "bleep")
+    align = data.get("align", True)
+    try:
+        check_redaction_options(redact_freq, mode)
+        if not isinstance(align, bool):
+            raise ValueError("align must be true or false")
+        redaction_points = redaction_points_for(highlight.json_path, words) \
+            if words else []
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    session = data.get("session") or uuid.uuid4().hex
+    entry = _get_preview(highlight.id, session)
+    if entry is None:
+        entry = (RedactionPreview(HIGHLIGHTS.audio(highlight.id)),
+                 threading.Lock())
+        with PREVIEWS_LOCK:
+            entry = PREVIEWS.setdefault((highlight.id, session), entry)
+            while len(PREVIEWS) > MAX_PREVIEWS:
+                PREVIEWS.popitem(last=False)
+    preview, lock = entry
+    try:
+        with lock:
+            changed = preview.update(redaction_points,
+                                     redact_freq=redact_freq, mode=mode,
+                                     align=align)
+            version = preview.version
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"session": session, "version": version,
+                    "changed": changed,
+                    "audioUrl": f"/api/highlights/{highlight.id}/preview/"
+                                f"{session}/audio?v={version}"})
+
+
+@app.route('/api/highlights/<highlight_id>/preview/<session>/audio',
+           methods=['GET'])
+def preview_audio(highlight_id, session):
+    entry = _get_preview(highlight_id, session)
+    if entry is None:
+        return jsonify({"error": f"Unknown preview: {session}"}), 404
+    preview, lock = entry
+
+    def read(start, stop):
+        # one copy under the lock, so an update can't tear the response
+        with lock:
+            return [preview.read(start, stop)]
+
+    with lock:
+        etag = f'"{session}-{preview.version}"'
+        size = preview.size
+    return _byte_response(size, read, etag, "audio/wav")
+
+
+@app.route('/api/highlights/<highlight_id>/preview/<session>',
+           methods=['DELETE'])
+def delete_preview(highlight_id, session):
+    with PREVIEWS_LOCK:
+        PREVIEWS.pop((highlight_id, session), None)
+    return Response(status=204)
+
+
+def redaction_job(job, highlight_id, redaction_points):
+    """
+    Redacts the highlight in a worker thread, checking for cancellation
+    between the decode, redact and encode stages.
+
+    The mp3 is encoded into a SpooledOutput of the job instead of a file,
+    and served from there by /api/jobs/<id>/audio.
+
+    Returns:
+        (Dictionary): audioUrl and size of the redacted mp3
+    """
+    job.set_stage("decoding")
+    audio = HIGHLIGHTS.audio(highlight_id)
+    job.check_cancelled()
+    job.set_stage("redacting")
+    audio = redact_audio_segment(audio, redaction_points, align=True)
+    job.check_cancelled()
+    job.set_stage("encoding")
+    output = SpooledOutput(max_memory=MAX_OUTPUT_MEMORY)
+    with metrics.timer("encode_seconds", "Time to encode audio files",
+                       format="mp3", encoder="ffmpeg"):
+        audio.export(output, format="mp3")
+    job.output = output
+    return {"audioUrl": f"/api/jobs/{job.id}/audio", "size": output.size}
+
+
+def _job_or_404(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return None, (jsonify({"error": f"Unknown job: {job_id}"}), 404)
+    return job, None
 
 
 @app.route("/api/redact", methods=["POST"])
 def redact():
-    data = request.get_json()
+    return redact_highlight(HIGHLIGHT_ID)
+
+
+@app.route("/api/highlights/<highlight_id>/redact", methods=["POST"])
+def redact_highlight(highlight_id):
+    highlight, error = _highlight_or_404(highlight_id)
+    if error:
+        return error
+    data = _json_body()
     print(data)
-    words_to_redact = data.get("words", [])
+    words_to_redact = data.get("words", []) if data is not None else []
 
-    if not words_to_redact:
+    if not words_to_redact or not isinstance(words_to_redact, list):
         return jsonify({"error": "No words provided for redaction"}), 400
+    # bad selections are rejected here instead of failing in the worker
+    try:
+        redaction_points = redaction_points_for(highlight.json_path,
+                                                words_to_redact)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
-        # Call your redaction function with the selected words
-        output_file = ""
-        if isinstance(words_to_redact[0], int):
-            output_file = redact_mp3_by_single_words(INPUT_AUDIO, INPUT_JSON, "/Users/granthu/VC Prototype/vc/audio-redaction-ui/frontend/build/data", 
-                                          "5300643", words_to_redact)
-        else:
-            output_file = redact_mp3_by_words(INPUT_AUDIO, INPUT_JSON, "/Users/granthu/VC Prototype/vc/audio-redaction-ui/frontend/build/data", 
-                                          "5300643", words_to_redact)
-        
-        print(output_file)
-        return jsonify({"message": "Redacted audio created", "filePath": output_file[(output_file.index("data"))-1:]})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        job = JOBS.submit(redaction_job, highlight.id, redaction_points)
+    except QueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    return jsonify({"message": "Redaction queued", "jobId": job.id,
+                    "status": job.status,
+                    "statusUrl": f"/api/jobs/{job.id}"}), 202
+
+
+@app.route("/api/jobs", methods=["GET"])
+def job_stats():
+    return jsonify(JOBS.stats())
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    # ?wait=<seconds> long-polls until the job changes or finishes
+    wait = request.args.get("wait", type=float)
+    if wait:
+        job.wait(request.args.get("version", type=int), timeout=min(wait, 30))
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+
+    def events():
+        version = None
+        while True:
+            status = job.to_dict()
+            if status["version"] != version:
+                version = status["version"]
+                yield f"data: {json.dumps(status)}\n\n"
+            if status["status"] in FINISHED:
+                return
+            if job.wait(version, timeout=15) == version:
+                # keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    status = job.to_dict()
+    if status["status"] == "done":
+        return jsonify({"message": "Redacted audio created",
+                        **status["result"]})
+    if status["status"] == "failed":
+        return jsonify({"error": status["error"]}), 500
+    if status["status"] == "cancelled":
+        return jsonify({"error": "Job was cancelled"}), 410
+    return jsonify(status), 202
+
+
+@app.route("/api/jobs/<job_id>/audio", methods=["GET"])
+def job_audio(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    output = job.output
+    if job.status != "done" or output is None or not output.acquire():
+        return jsonify({"error": "Job has no audio", **job.to_dict()}), 404
+    # a job's output never changes, so clients may keep it
+    response = _byte_response(output.size, output.chunks, f'"{job.id}"',
+                              "audio/mpeg",
+                              cache_control="private, max-age=3600, immutable")
+    # the job may be forgotten while the response is still streaming
+    response.call_on_close(output.release)
+    return response
+
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    if not job.cancel():
+        return jsonify({"error": "Job already finished",
+                        **job.to_dict()}), 409
+    return jsonify(job.to_dict())
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,301 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import repo_root  # noqa: F401
+from conversation_highlight import load_word_index
+from lexicon import RedactionLexicon
+from redaction import (
+    lexicon_redaction_points,
+    redact_audio_file,
+    word_redaction_points
+)
+
+MANIFEST_NAME = "manifest.json"
+# subdirectory of the input directory outputs go to by default, so the
+# redacted_<id>.mp3 files checked in next to the inputs are left alone
+DEFAULT_OUTPUT_SUBDIR = "redacted"
+HIGHLIGHT_PATTERN = re.compile(r"^highlight-(\d+)\.mp3$")
+
+
+class RedactionPolicy:
+    """
+    What to redact in every highlight of a batch.
+
+    @arg words = list of Strings, words and phrases redacted wherever they
+    are said
+    @arg patterns = list of Strings, regular expressions of words to redact
+    @arg indices = list of ints, transcript positions to redact
+    @arg time_ranges = list of (start, end) tuples, milliseconds of audio
+    @arg redact_freq = int, frequency of the bleep tone in Hz
+    @arg mode = String, "bleep" for a sine tone or "silence" for zeros
+    @arg align = boolean, move redaction boundaries to the gaps between words
+    """
+    def __init__(self, words=None, indices=None, time_ranges=None,
+                 redact_freq=1000, mode="bleep", patterns=None, align=True):
+        self.words = list(words or [])
+        self.patterns = list(patterns or [])
+        self.indices = [int(i) for i in indices or []]
+        self.time_ranges = [(float(start), float(end))
+                            for start, end in time_ranges or []]
+        self.redact_freq = redact_freq
+        self.mode = mode
+        self.align = align
+        self._lexicon = None
+
+    @classmethod
+    def from_json(cls, file_path):
+        """
+        Reads a policy from a .json file with any of the keys words,
+        patterns, indices, time_ranges, redact_freq, mode and align.
+        """
+        with open(file_path, "r") as file:
+            return cls(**json.load(file))
+
+    def to_dict(self):
+        return {"words": self.words, "patterns": self.patterns,
+                "indices": self.indices,
+                "time_ranges": self.time_ranges,
+                "redact_freq": self.redact_freq, "mode": self.mode,
+                "align": self.align}
+
+    def digest(self):
+        """
+        Returns a SHA-256 of the policy, so outputs rendered with a
+        different policy are not mistaken for up to date.
+        """
+        data = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return hashlib.sha256(data).hexdigest()
+
+    @property
+    def lexicon(self):
+        if self._lexicon is None:
+            self._lexicon = RedactionLexicon(self.words, self.patterns)
+        return self._lexicon
+
+    def redaction_points(self, input_json):
+        """
+        Returns the (start, end) milliseconds to redact in a highlight, and
+        the word indices that the highlight doesn't have.
+
+        Args:
+            input_json (String): Path to .json file of the highlight
+        Returns:
+            redaction_points (list of tuples): (start, end) times in
+            milliseconds, unmerged
+            out_of_range (list of ints): indices past the last word of
+            the highlight, which were not redacted
+        """
+        points = list(self.time_ranges)
+        out_of_range = []
+        if self.words or self.patterns or self.indices:
+            index = load_word_index(input_json)
+            points += lexicon_redaction_points(index, self.lexicon)
+            out_of_range = [i for i in self.indices
+                            if not 0 <= i < len(index)]
+            points += word_redaction_points(
+                index, [i for i in self.indices if 0 <= i < len(index)])
+        return points, out_of_range
+
+
+def find_highlights(directory):
+    """
+    Finds the highlight-<id>.mp3 files of a directory that have a
+    conversation-<id>.json next to them.
+
+    Returns:
+        highlights (list of tuples): (id, audio path, json path), by id
+    """
+    highlights = []
+    for name in sorted(os.listdir(directory)):
+        match = HIGHLIGHT_PATTERN.match(name)
+        if match is None:
+            continue
+        id = match.group(1)
+        input_json = os.path.join(directory, f"conversation-{id}.json")
+        if os.path.exists(input_json):
+            highlights.append((id, os.path.join(directory, name), input_json))
+    return highlights
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".part", "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(path + ".part", path)
+
+
+def _build_manifest(policy, policy_digest, directory, entries, seconds):
+    statuses = [entry["status"] for entry in entries.values()]
+    return {
+        "policy": policy.to_dict(),
+        "policy_digest": policy_digest,
+        "directory": directory,
+        "seconds": round(seconds, 3),
+        "done": statuses.count("done"),
+        "skipped": statuses.count("skipped"),
+        "failed": statuses.count("failed"),
+        "highlights": dict(sorted(entries.items())),
+    }
+
+
+def is_up_to_date(output_path, inputs, entry, policy_digest):
+    """
+    Checks if an output was rendered with the current policy from inputs
+    that haven't changed since.
+
+    Args:
+        output_path (String): redacted mp3 file
+        inputs (list of Strings): files the output was rendered from
+        entry (Dictionary): manifest entry of the previous run, may be None
+        policy_digest (String): RedactionPolicy.digest() of this run
+    Returns:
+        (boolean): True if the output can be kept
+    """
+    if entry is None or entry.get("status") not in ("done", "skipped") or \
+            entry.get("policy") != policy_digest or \
+            not os.path.exists(output_path):
+        return False
+    output_mtime = os.path.getmtime(output_path)
+    return all(os.path.getmtime(path) <= output_mtime for path in inputs)
+
+
+def redact_highlight(id, input_audio, input_json, output_path, policy):
+    """
+    Redacts one highlight, runs in the worker processes.
+
+    Returns:
+        (Dictionary): manifest entry of the highlight
+    """
+    begin = time.perf_counter()
+    points, out_of_range = policy.redaction_points(input_json)
+    if out_of_range:
+        print(f"{id}: no words at indices {out_of_range}, not redacted")
+    redact_audio_file(input_audio, output_path, points,
+                      redact_freq=policy.redact_freq, mode=policy.mode,
+                      align=policy.align)
+    return {"id": id, "status": "done", "output": output_path,
+            "redactions": len(points), "out_of_range": out_of_range,
+            "seconds": round(time.perf_counter() - begin, 3)}
+
+
+def redact_directory(directory, policy, output_dir=None, workers=None,
+                     force=False):
+    """
+    Redacts every highlight of a directory across a process pool, skipping
+    highlights whose output is up to date, and keeps a manifest.json
+    summary next to the outputs. The manifest is rewritten after every
+    highlight, so an interrupted batch resumes where it stopped.
+
+    Args:
+        directory (String): directory with highlight-<id>.mp3 and
+        conversation-<id>.json files, e.g. testing or conversations
+        policy (RedactionPolicy): what to redact
+        output_dir (String): where redacted_<id>.mp3 files go, the
+        "redacted" subdirectory of directory if None
+        workers (int): number of processes, os.cpu_count() if None
+        force (boolean): redact highlights even if they are up to date
+    Returns:
+        manifest (Dictionary): policy, totals and one entry per highlight
+    """
+    output_dir = output_dir or os.path.join(directory, DEFAULT_OUTPUT_SUBDIR)
+    os.makedirs(output_dir, exist_ok=True)
+    previous = _load_manifest(output_dir).get("highlights", {})
+    policy_digest = policy.digest()
+    highlights = find_highlights(directory)
+    entries = {}
+    pending = []
+    for id, input_audio, input_json in highlights:
+        output_path = os.path.join(output_dir, f"redacted_{id}.mp3")
+        if not force and is_up_to_date(output_path, [input_audio, input_json],
+                                       previous.get(id), policy_digest):
+            entries[id] = dict(previous[id], status="skipped",
+                               policy=policy_digest)
+        else:
+            pending.append((id, input_audio, input_json, output_path))
+    print(f"{len(highlights)} highlights, {len(entries)} up to date, "
+          f"{len(pending)} to redact")
+
+    begin = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(redact_highlight, *args, policy):
+                       args[0] for args in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                id = futures[future]
+                try:
+                    entries[id] = future.result()
+                except Exception as e:
+                    entries[id] = {"id": id, "status": "failed",
+                                   "error": repr(e)}
+                entries[id]["policy"] = policy_digest
+                _save_manifest(output_dir, _build_manifest(
+                    policy, policy_digest, directory, entries,
+                    time.perf_counter() - begin))
+                print(f"[{done}/{len(pending)}] {id}: {entries[id]['status']}")
+
+    manifest = _build_manifest(policy, policy_digest, directory, entries,
+                               time.perf_counter() - begin)
+    _save_manifest(output_dir, manifest)
+    print(f"done: {manifest['done']}, skipped: {manifest['skipped']}, "
+          f"failed: {manifest['failed']} in {manifest['seconds']} s")
+    return manifest
+
+
+def _time_range(value):
+    start, end = value.split("-")
+    return float(start), float(end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="redact every highlight of a directory")
+    parser.add_argument("directory",
+                        help="directory with highlight-<id>.mp3 and "
+                             "conversation-<id>.json files")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--policy", default=None,
+                        help=".json file with words, indices, time_ranges, "
+                             "redact_freq and mode")
+    parser.add_argument("--words", nargs="+", default=[],
+                        help="words or quoted phrases to redact")
+    parser.add_argument("--patterns", nargs="+", default=[],
+                        help="regular expressions of words to redact")
+    parser.add_argument("--lexicon", default=None,
+                        help="file with one word, phrase or re:pattern "
+                             "per line")
+    parser.add_argument("--indices", nargs="+", type=int, default=[])
+    parser.add_argument("--times", nargs="+", type=_time_range, default=[],
+                        help="time ranges in milliseconds, e.g. 3000-5000")
+    parser.add_argument("--mode", choices=["bleep", "silence"],
+                        default="bleep")
+    parser.add_argument("--no-align", dest="align", action="store_false",
+                        help="redact the transcript timestamps as they are")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true",
+                        help="redact highlights that are up to date too")
+    args = parser.parse_args()
+    if args.policy is not None:
+        policy = RedactionPolicy.from_json(args.policy)
+    else:
+        words, patterns = list(args.words), list(args.patterns)
+        if args.lexicon is not None:
+            lexicon = RedactionLexicon.from_file(args.lexicon)
+            words += lexicon.terms
+            patterns += lexicon.patterns
+        policy = RedactionPolicy(words, args.indices, args.times,
+                                 mode=args.mode, patterns=patterns,
+                                 align=args.align)
+    redact_directory(args.directory, policy, output_dir=args.output_dir,
+                     workers=args.workers, force=args.force)
@@ -0,0 +1,67 @@
+import argparse
+import time
+import numpy as np
+from pydub import AudioSegment
+from pydub.generators import Sine
+from redaction import redact_audio_segment
+
+
+def make_audio(minutes, samp_rate):
+    """
+    Builds a synthetic mono 16-bit AudioSegment of noise.
+
+    Args:
+        minutes (float): length of the audio in minutes
+        samp_rate (int): sampling rate, in samples/sec
+    Returns:
+        (AudioSegment): synthetic audio
+    """
+    rng = np.random.default_rng(0)
+    samples = rng.integers(-3000, 3000, int(minutes * 60 * samp_rate),
+                           dtype=np.int16)
+    return AudioSegment(data=samples.tobytes(), sample_width=2,
+                        frame_rate=samp_rate, channels=1)
+
+
+def make_redaction_points(count, length_ms, word_ms=300):
+    """
+    Spreads count word-sized redactions evenly over the audio.
+    """
+    step = length_ms / count
+    return [(int(i * step), int(i * step) + word_ms) for i in range(count)]
+
+
+def redact_by_slicing(audio, redaction_points, redact_freq=1000):
+    """
+    The previous per-word implementation, kept here as the baseline.
+    """
+    for start, end in redaction_points:
+        bleep = Sine(redact_freq).to_audio_segment(duration=end - start)
+        audio = audio[:start] + bleep + audio[end:]
+    return audio
+
+
+def main(minutes, samp_rate, counts):
+    audio = make_audio(minutes, samp_rate)
+    print(f"{minutes} min of audio at {samp_rate} Hz")
+    print(f"{'redactions':>10} {'slicing (s)':>12} {'single pass (s)':>16}")
+    for count in counts:
+        points = make_redaction_points(count, len(audio))
+        begin = time.perf_counter()
+        redact_by_slicing(audio, points)
+        slicing = time.perf_counter() - begin
+        begin = time.perf_counter()
+        redact_audio_segment(audio, points)
+        single_pass = time.perf_counter() - begin
+        print(f"{count:>10} {slicing:>12.3f} {single_pass:>16.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="benchmark redaction time against redaction count")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--counts", type=int, nargs="+",
+                        default=[10, 50, 100, 200, 400])
+    args = parser.parse_args()
+    main(args.minutes, args.sample_rate, args.counts)
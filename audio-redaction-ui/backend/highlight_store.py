@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pydub import AudioSegment
+import repo_root  # noqa: F401
+import metrics
+from conversation_highlight import load_word_index
+
+
+def _etag(payload):
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+
+class CachedHighlight:
+    """
+    Parsed highlight with its API responses rendered once, so serving a
+    transcript is a dictionary lookup.
+
+    @arg id = String, ID of the highlight
+    @arg audio_path = String, highlight-<id>.mp3
+    @arg json_path = String, conversation-<id>.json
+    """
+    def __init__(self, id, audio_path, json_path):
+        self.id = id
+        self.audio_path = audio_path
+        self.json_path = json_path
+        self.mtime_ns = os.stat(json_path).st_mtime_ns
+        self.index = load_word_index(json_path)
+        self.payloads = {}
+        self.etags = {}
+        self._add_payload("transcript",
+                          {"id": id, "transcript": self.index.transcript})
+        self._add_payload("words", {
+            "id": id,
+            "audioStartOffset": self.index.audio_start_offset,
+            "words": self.index.words,
+            "starts": self.index.starts.tolist(),
+            "ends": self.index.ends.tolist(),
+        })
+
+    def _add_payload(self, name, data):
+        payload = json.dumps(data).encode()
+        self.payloads[name] = payload
+        self.etags[name] = _etag(payload)
+
+    def is_stale(self):
+        try:
+            return os.stat(self.json_path).st_mtime_ns != self.mtime_ns
+        except OSError:
+            return True
+
+
+class HighlightStore:
+    """
+    Finds highlights by ID in a list of directories and keeps the most
+    recently used ones parsed and decoded in memory.
+
+    @arg directories = list of Strings, directories holding
+    highlight-<id>.mp3 and conversation-<id>.json files
+    @arg max_highlights = int, parsed highlights kept
+    @arg max_decoded = int, decoded audio kept, much larger per highlight
+    """
+    def __init__(self, directories, max_highlights=64, max_decoded=4):
+        self.directories = list(directories)
+        self.max_highlights = max_highlights
+        self.max_decoded = max_decoded
+        self.highlights = OrderedDict()
+        self.decoded = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def paths(self, id):
+        """
+        Returns:
+            (String, String): audio and .json paths of the highlight
+        Raises:
+            KeyError: if no directory has both files
+        """
+        if not str(id).isdigit():
+            raise KeyError(id)
+        for directory in self.directories:
+            audio_path = os.path.join(directory, f"highlight-{id}.mp3")
+            json_path = os.path.join(directory, f"conversation-{id}.json")
+            if os.path.exists(audio_path) and os.path.exists(json_path):
+                return audio_path, json_path
+        raise KeyError(id)
+
+    def ids(self):
+        """
+        Returns the IDs of every highlight in the directories.
+        """
+        ids = set()
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.startswith("highlight-") and name.endswith(".mp3"):
+                    id = name[len("highlight-"):-len(".mp3")]
+                    if os.path.exists(os.path.join(
+                            directory, f"conversation-{id}.json")):
+                        ids.add(id)
+        return sorted(ids)
+
+    def get(self, id):
+        """
+        Returns the parsed highlight, parsing it on a miss or when its
+        .json changed since it was parsed.
+
+        Returns:
+            (CachedHighlight)
+        Raises:
+            KeyError: if the highlight doesn't exist
+        """
+        with self.lock:
+            highlight = self.highlights.get(id)
+            if highlight is not None and not highlight.is_stale():
+                self.highlights.move_to_end(id)
+                self.stats["hits"] += 1
+                return highlight
+        self.stats["misses"] += 1
+        highlight = CachedHighlight(id, *self.paths(id))
+        with self.lock:
+            self.highlights[id] = highlight
+            self.highlights.move_to_end(id)
+            while len(self.highlights) > self.max_highlights:
+                self.highlights.popitem(last=False)
+        return highlight
+
+    def audio(self, id):
+        """
+        Returns the decoded audio of a highlight, decoding it on a miss.
+
+        Returns:
+            (AudioSegment)
+        """
+        audio_path, _ = self.paths(id)
+        key = (audio_path, os.stat(audio_path).st_mtime_ns)
+        with self.lock:
+            audio = self.decoded.get(key)
+            if audio is not None:
+                self.decoded.move_to_end(key)
+                return audio
+        with metrics.timer("decode_seconds", "Time to decode audio files",
+                           decoder="ffmpeg"):
+            audio = AudioSegment.from_file(audio_path, format="mp3")
+        with self.lock:
+            self.decoded[key] = audio
+            while len(self.decoded) > self.max_decoded:
+                self.decoded.popitem(last=False)
+        return audio
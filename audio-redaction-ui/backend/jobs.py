@@ -0,0 +1,287 @@
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted while max_pending jobs are waiting.
+    """
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job by Job.check_cancelled once the job has
+    been cancelled, ending it at the next stage boundary.
+    """
+
+
+class SpooledOutput:
+    """
+    Binary output of a job, kept in memory up to max_memory bytes and
+    spilled to a temporary file past that. Byte ranges can be streamed
+    from several threads at once, each reader holding the output open
+    between acquire and release.
+
+    @arg max_memory = int, bytes kept in memory before spilling to disk
+    """
+    def __init__(self, max_memory=8 * 1024 ** 2):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.lock = threading.Lock()
+        self.size = 0
+        self.position = 0
+        self.readers = 0
+        self.closing = False
+
+    def seek(self, offset, whence=0):
+        # encoders seek the output like a file, readers use chunks
+        with self.lock:
+            base = {0: 0, 1: self.position, 2: self.size}[whence]
+            self.position = base + offset
+            return self.position
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def write(self, data):
+        with self.lock:
+            self.file.seek(self.position)
+            self.file.write(data)
+            self.position += len(data)
+            self.size = max(self.size, self.position)
+        return len(data)
+
+    def chunks(self, start=0, stop=None, chunk_size=64 * 1024):
+        """
+        Yields bytes [start, stop) of the output in chunks.
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        while start < stop:
+            with self.lock:
+                self.file.seek(start)
+                chunk = self.file.read(min(chunk_size, stop - start))
+            if not chunk:
+                return
+            start += len(chunk)
+            yield chunk
+
+    def acquire(self):
+        """
+        Registers a reader, so close waits until it is released.
+
+        Returns:
+            (boolean): False if the output is already closed or closing
+        """
+        with self.lock:
+            if self.closing:
+                return False
+            self.readers += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.readers -= 1
+            if self.closing and self.readers == 0:
+                self.file.close()
+
+    def close(self):
+        """
+        Closes the output once its last reader is released.
+        """
+        with self.lock:
+            self.closing = True
+            if self.readers == 0:
+                self.file.close()
+
+
+class Job:
+    """
+    Background task and its status. The task is called as
+    func(job, *args, **kwargs) so it can report its stage through
+    set_stage and stop early through check_cancelled.
+
+    @arg func = function doing the work, its return value is the result
+    @arg args = tuple, further positional arguments of func
+    @arg kwargs = Dictionary, keyword arguments of func
+    """
+    def __init__(self, func, args=(), kwargs=None):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.status = QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        # binary output (SpooledOutput) kept out of the JSON status
+        self.output = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.version = 0
+        self.cancel_requested = threading.Event()
+        self.changed = threading.Condition()
+
+    def _update(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+
+    def set_stage(self, stage):
+        """
+        Reports what a running job is doing, e.g. "decoding".
+        """
+        self._update(stage=stage)
+
+    def check_cancelled(self):
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        """
+        Cancels the job. A queued job never starts, a running job stops at
+        its next check_cancelled.
+
+        Returns:
+            (boolean): False if the job had already finished
+        """
+        with self.changed:
+            if self.status in FINISHED:
+                return False
+            self.cancel_requested.set()
+            if self.status == QUEUED:
+                self.status = CANCELLED
+                self.finished = time.time()
+                self.version += 1
+                self.changed.notify_all()
+            return True
+
+    def wait(self, version=None, timeout=None):
+        """
+        Blocks until the job changes after version, or until it finishes
+        if version is None.
+
+        Returns:
+            version (int): version of the job when the wait ended
+        """
+        with self.changed:
+            if version is None:
+                self.changed.wait_for(lambda: self.status in FINISHED,
+                                      timeout)
+            else:
+                self.changed.wait_for(lambda: self.version != version,
+                                      timeout)
+            return self.version
+
+    def to_dict(self):
+        with self.changed:
+            return {"id": self.id, "status": self.status,
+                    "stage": self.stage, "result": self.result,
+                    "error": self.error, "created": self.created,
+                    "started": self.started, "finished": self.finished,
+                    "version": self.version}
+
+    def run(self):
+        with self.changed:
+            if self.status != QUEUED:
+                return
+            self.status = RUNNING
+            self.started = time.time()
+            self.version += 1
+            self.changed.notify_all()
+        try:
+            self.check_cancelled()
+            result = self.func(self, *self.args, **self.kwargs)
+        except JobCancelled:
+            self._update(status=CANCELLED, finished=time.time())
+        except Exception as e:
+            self._update(status=FAILED, error=str(e), finished=time.time())
+        else:
+            self._update(status=DONE, result=result, stage=None,
+                         finished=time.time())
+
+
+class JobQueue:
+    """
+    Runs jobs on a fixed pool of worker threads behind a bounded queue, so
+    requests only submit work and return while slow redactions run in the
+    background.
+
+    @arg workers = int, number of jobs running at once
+    @arg max_pending = int, jobs that may wait for a worker before
+    submit raises QueueFull
+    @arg max_finished = int, finished jobs kept for polling before the
+    oldest are forgotten
+    """
+    def __init__(self, workers=4, max_pending=32, max_finished=256):
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._work, daemon=True,
+                                         name=f"job-worker-{number}")
+                        for number in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            job = self.pending.get()
+            try:
+                job.run()
+            finally:
+                self.pending.task_done()
+
+    def _forget_finished(self):
+        finished = [id for id, job in self.jobs.items()
+                    if job.status in FINISHED]
+        for id in finished[:max(len(finished) - self.max_finished, 0)]:
+            job = self.jobs.pop(id)
+            if job.output is not None:
+                job.output.close()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues func(job, *args, **kwargs).
+
+        Returns:
+            job (Job): the queued job
+        """
+        job = Job(func, args, kwargs)
+        with self.lock:
+            try:
+                self.pending.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self.pending.maxsize} jobs are already "
+                                f"waiting")
+            self.jobs[job.id] = job
+            self._forget_finished()
+        return job
+
+    def get(self, id):
+        """
+        Returns the job with the given ID, None if it is unknown.
+        """
+        with self.lock:
+            return self.jobs.get(id)
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status)
+                for status in (QUEUED, RUNNING) + FINISHED}
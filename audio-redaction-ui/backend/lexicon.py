@@ -0,0 +1,133 @@
+import re
+from collections import deque
+import repo_root  # noqa: F401
+from conversation_highlight import normalize_word
+
+
+def tokenize(term):
+    """
+    Splits a word or phrase into the normalized tokens it is matched by.
+
+    Args:
+        term (String): e.g. "New York" or "Gay,"
+    Returns:
+        tokens (list of Strings): e.g. ["new", "york"] or ["gay"]
+    """
+    return [token for token in (normalize_word(word) for word in term.split())
+            if token]
+
+
+class RedactionLexicon:
+    """
+    Redaction terms compiled into an Aho-Corasick automaton over word
+    tokens, so a transcript is scanned once for every term at the same time
+    however large the lexicon is. Words and phrases are matched after
+    normalize_word, so case and surrounding punctuation don't matter.
+
+    @arg terms = list of Strings, words or multi-word phrases
+    @arg patterns = list of Strings, regular expressions a whole normalized
+    word must match, e.g. r"\\d{3,}" for long numbers
+    """
+    def __init__(self, terms=(), patterns=()):
+        # state 0 is the root, goto[state] maps a token to the next state
+        self.goto = [{}]
+        self.fail = [0]
+        # lengths (in tokens) of the terms ending in each state
+        self.output = [[]]
+        self.terms = []
+        for term in terms:
+            self.add(term)
+        self.patterns = list(patterns)
+        self.pattern = re.compile("|".join(f"(?:{pattern})"
+                                           for pattern in self.patterns)) \
+            if self.patterns else None
+        self._build()
+
+    @classmethod
+    def from_file(cls, file_path):
+        """
+        Reads a lexicon with one term per line. Lines starting with "re:"
+        are regular expressions, empty lines and lines starting with "#"
+        are skipped.
+        """
+        terms, patterns = [], []
+        with open(file_path, "r") as file:
+            for line in file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("re:"):
+                    patterns.append(line[3:])
+                else:
+                    terms.append(line)
+        return cls(terms, patterns)
+
+    def add(self, term):
+        tokens = tokenize(term)
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            if token not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][token] = len(self.goto) - 1
+            state = self.goto[state][token]
+        if len(tokens) not in self.output[state]:
+            self.output[state].append(len(tokens))
+        self.terms.append(term)
+
+    def _build(self):
+        """
+        Sets the failure links breadth first, so every state also reports
+        the terms that are suffixes of its own.
+        """
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and token not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(token, 0)
+                self.output[next_state] += [
+                    length for length in self.output[self.fail[next_state]]
+                    if length not in self.output[next_state]]
+
+    def __len__(self):
+        return len(self.terms) + len(self.patterns)
+
+    def spans(self, words):
+        """
+        Scans a word stream for every term and pattern in one pass.
+
+        Args:
+            words (iterable of Strings): words as they appear in the
+            transcript, e.g. WordIndex.words
+        Returns:
+            spans (list of tuples): (first, last) positions of every match,
+            both inclusive, in the order the matches end
+        """
+        spans = []
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for position, word in enumerate(words):
+            token = normalize_word(word)
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for length in output[state]:
+                spans.append((position - length + 1, position))
+            if self.pattern is not None and token and \
+                    self.pattern.fullmatch(token):
+                spans.append((position, position))
+        return spans
+
+    def positions(self, words):
+        """
+        Returns the sorted positions of every word covered by a match.
+        """
+        return sorted({position for first, last in self.spans(words)
+                       for position in range(first, last + 1)})
@@ -1,8 +1,336 @@
-import json
+import bisect
+import struct
+import numpy as np
 from pydub import AudioSegment
-from pydub.generators import Sine
+from pydub.utils import get_array_type
 from datetime import datetime
-from conversation_highlight import generate_transcript
+import repo_root  # noqa: F401
+import metrics
+from conversation_highlight import LEAD_IN_MS, load_word_index
+from lexicon import RedactionLexicon
+
+# how far from a word timestamp align_intervals looks for the quietest spot
+ALIGN_SEARCH_MS = 80
+# length of the frames whose energy align_intervals compares
+ALIGN_FRAME_MS = 10
+
+
+def merge_intervals(intervals):
+    """
+    Sorts and merges overlapping or touching (start, end) intervals.
+
+    Args:
+        intervals (list of tuples): List of (start, end) times in milliseconds
+    Returns:
+        merged (list of tuples): sorted, non-overlapping (start, end) times
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+@metrics.timed("redaction_seconds", "Time of redaction steps",
+               step="align")
+def align_intervals(samples, rate, intervals, search_ms=ALIGN_SEARCH_MS,
+                    frame_ms=ALIGN_FRAME_MS):
+    """
+    Moves every interval boundary outwards to the quietest frame within
+    search_ms of it, then onto the nearest zero crossing, so a redaction
+    starts and ends in the gap between words instead of wherever the
+    transcript timestamps put it. Starts only move earlier and ends only
+    later, so a redaction never shrinks into the word it hides. Only the
+    samples around the boundaries are read, so the cost doesn't grow with
+    the length of the audio.
+
+    Args:
+        samples (numpy.ndarray): (samples, channels) audio
+        rate (int): sample rate of the audio
+        intervals (list of tuples): (start, end) times in milliseconds
+        search_ms (float): how far a boundary may move outwards
+        frame_ms (float): length of the frames compared by energy
+    Returns:
+        intervals (list of tuples): sorted, merged (start, end) times in
+        milliseconds
+    """
+    intervals = merge_intervals(intervals)
+    total = samples.shape[0]
+    if not intervals or total == 0:
+        return intervals
+    frame = max(int(rate * frame_ms / 1000), 1)
+    search = int(rate * search_ms / 1000)
+    reach = search + frame
+    bounds = np.rint(np.array(intervals) * rate / 1000).astype(np.int64)
+    bounds = np.clip(bounds, 0, total)
+    # (intervals, 2, window) samples around every boundary, mixed to mono
+    window = np.arange(-reach, reach + 1)
+    x = samples[np.clip(bounds[..., np.newaxis] + window, 0, total - 1)]
+    x = x.astype(np.float64).mean(axis=-1)
+
+    # short-time energy of the frames centred on every candidate offset
+    offsets = np.arange(-search, search + 1, max(frame // 4, 1))
+    energy_sum = np.concatenate((np.zeros(x.shape[:-1] + (1,)),
+                                 np.cumsum(x * x, axis=-1)), axis=-1)
+    frame_starts = offsets + reach - frame // 2
+    energy = energy_sum[..., frame_starts + frame] - \
+        energy_sum[..., frame_starts]
+    # among equally quiet frames, the one closest to the timestamp wins
+    distance = np.abs(offsets) / max(search, 1)
+    energy = energy + distance * (1e-6 * energy.max(axis=-1, keepdims=True)
+                                  + 1e-12)
+    # starts search before the timestamp, ends after it
+    energy[:, 0, offsets > 0] = np.inf
+    energy[:, 1, offsets < 0] = np.inf
+    centres = offsets[np.argmin(energy, axis=-1)] + reach
+
+    # nearest zero crossing within half a frame of the quietest frame
+    signs = np.signbit(x)
+    crossings = np.arange(1, x.shape[-1])
+    distance = np.abs(crossings - centres[..., np.newaxis]).astype(np.float64)
+    distance[(signs[..., 1:] == signs[..., :-1]) |
+             (distance > frame // 2)] = np.inf
+    nearest = np.argmin(distance, axis=-1)
+    has_crossing = np.isfinite(np.take_along_axis(
+        distance, nearest[..., np.newaxis], axis=-1)[..., 0])
+    centres = np.where(has_crossing, crossings[nearest], centres)
+
+    aligned = np.clip(bounds + centres - reach, 0, total)
+    # a zero crossing may lie just inside the word, never move inwards
+    aligned[:, 0] = np.minimum(aligned[:, 0], bounds[:, 0])
+    aligned[:, 1] = np.maximum(aligned[:, 1], bounds[:, 1])
+    return merge_intervals([(start * 1000 / rate, end * 1000 / rate)
+                            for start, end in aligned.tolist()])
+
+
+def _sample_range(start, end, rate, total):
+    """
+    Converts (start, end) milliseconds to clamped sample indices.
+    """
+    first = min(max(int(round(start * rate / 1000)), 0), total)
+    last = min(max(int(round(end * rate / 1000)), 0), total)
+    return first, last
+
+
+def check_redaction_options(redact_freq, mode):
+    """
+    Raises ValueError unless redact_freq is a positive number of Hz and mode
+    is "bleep" or "silence".
+    """
+    if mode not in ("bleep", "silence"):
+        raise ValueError(f"Unknown redaction mode: {mode}")
+    if isinstance(redact_freq, bool) or \
+            not isinstance(redact_freq, (int, float)) or \
+            not 0 < redact_freq < float("inf"):
+        raise ValueError(f"Redaction frequency must be a positive number "
+                         f"of Hz, not {redact_freq!r}")
+
+
+def _render_interval(samples, first, last, rate, redact_freq, mode,
+                     max_amplitude):
+    """
+    Overwrites samples[first:last] with a bleep or silence.
+    """
+    if mode == "silence":
+        samples[first:last] = 0
+        return
+    # the tone restarts at phase 0 for every interval, like a fresh Sine
+    n = np.arange(last - first)
+    tone = np.sin(2 * np.pi * redact_freq * n / rate) * max_amplitude
+    samples[first:last] = tone.astype(samples.dtype)[:, np.newaxis]
+
+
+@metrics.timed("redaction_seconds", "Time of redaction steps",
+               step="render")
+def redact_audio_segment(audio, redaction_points, redact_freq=1000,
+                         mode="bleep", align=False):
+    """
+    Redacts every interval of an AudioSegment in a single pass over one
+    NumPy sample buffer, instead of re-slicing the segment per interval.
+
+    Args:
+        audio (AudioSegment): decoded audio to redact
+        redaction_points (list of tuples): List of (start, end) times in
+        milliseconds for redaction, may overlap and be unsorted
+        redact_freq (int): Frequency of the bleep tone in Hz
+        (default is 1000 Hz)
+        mode (String): "bleep" for a sine tone or "silence" for zeros
+        align (boolean): move the boundaries to the gaps between words
+        with align_intervals first
+    Returns:
+        (AudioSegment): redacted audio with the same length and parameters
+    """
+    if mode not in ("bleep", "silence"):
+        raise ValueError(f"Unknown redaction mode: {mode}")
+    channels = audio.channels
+    rate = audio.frame_rate
+    samples = np.array(audio.get_array_of_samples()).reshape(-1, channels)
+    total = samples.shape[0]
+    max_amplitude = 2 ** (8 * audio.sample_width - 1) - 1
+    if align:
+        redaction_points = align_intervals(samples, rate, redaction_points)
+    redaction_points = merge_intervals(redaction_points)
+    metrics.counter("redacted_intervals_total",
+                    "Intervals bleeped or silenced").inc(len(redaction_points))
+    for start, end in redaction_points:
+        first, last = _sample_range(start, end, rate, total)
+        if last > first:
+            _render_interval(samples, first, last, rate, redact_freq, mode,
+                             max_amplitude)
+    return audio._spawn(samples.tobytes())
+
+
+class RedactionPreview:
+    """
+    Redacted copy of decoded audio that is kept up to date incrementally:
+    when the redactions change, only intervals that were added or removed
+    are re-rendered, and the audio is served as PCM WAV so any byte range
+    can be read without encoding the whole file.
+
+    @arg audio = AudioSegment, decoded audio of the highlight. Its samples
+    are read in place, so previews of the same AudioSegment share one
+    original
+    """
+    def __init__(self, audio):
+        self.channels = audio.channels
+        self.rate = audio.frame_rate
+        self.sample_width = audio.sample_width
+        # read-only view of the segment's bytes, not a copy
+        self.original = np.frombuffer(
+            audio.raw_data, dtype=get_array_type(8 * self.sample_width)
+        ).reshape(-1, self.channels)
+        self.samples = self.original.copy()
+        self.max_amplitude = 2 ** (8 * self.sample_width - 1) - 1
+        self.intervals = []
+        self.redact_freq = 1000
+        self.mode = "bleep"
+        self.version = 0
+        self.header = self._wav_header()
+
+    def _wav_header(self):
+        data_size = self.samples.nbytes
+        block_align = self.channels * self.sample_width
+        return b"RIFF" + struct.pack("<I", 36 + data_size) + b"WAVE" + \
+            b"fmt " + struct.pack("<IHHIIHH", 16, 1, self.channels, self.rate,
+                                  self.rate * block_align, block_align,
+                                  8 * self.sample_width) + \
+            b"data" + struct.pack("<I", data_size)
+
+    @property
+    def size(self):
+        """
+        Size in bytes of the WAV file.
+        """
+        return len(self.header) + self.samples.nbytes
+
+    @metrics.timed("redaction_seconds", "Time of redaction steps",
+                   step="preview")
+    def update(self, redaction_points, redact_freq=1000, mode="bleep",
+               align=False):
+        """
+        Changes the redactions, re-rendering only the intervals that were
+        added or removed, or everything if the tone or mode changed. If
+        rendering fails the preview is left as it was.
+
+        Args:
+            redaction_points (list of tuples): List of (start, end) times in
+            milliseconds for redaction, may overlap and be unsorted
+            redact_freq (int): Frequency of the bleep tone in Hz
+            mode (String): "bleep" for a sine tone or "silence" for zeros
+            align (boolean): move the boundaries to the gaps between words
+            with align_intervals first
+        Returns:
+            changed (list of tuples): merged (start, end) milliseconds whose
+            audio changed
+        Raises:
+            ValueError: if mode or redact_freq is invalid
+        """
+        check_redaction_options(redact_freq, mode)
+        if align:
+            intervals = align_intervals(self.original, self.rate,
+                                        redaction_points)
+        else:
+            intervals = merge_intervals(redaction_points)
+        if redact_freq != self.redact_freq or mode != self.mode:
+            removed, added = self.intervals, intervals
+        else:
+            old, new = set(self.intervals), set(intervals)
+            removed = [interval for interval in self.intervals
+                       if interval not in new]
+            added = [interval for interval in intervals if interval not in old]
+        total = self.samples.shape[0]
+        changed = merge_intervals(list(removed) + list(added))
+        # the samples about to change, to roll back to if rendering fails
+        saved = [(first, last, self.samples[first:last].copy())
+                 for first, last in (_sample_range(start, end, self.rate,
+                                                   total)
+                                     for start, end in changed)]
+        try:
+            # merged intervals are disjoint, so restoring a removed one
+            # never touches an interval that is kept
+            for start, end in removed:
+                first, last = _sample_range(start, end, self.rate, total)
+                self.samples[first:last] = self.original[first:last]
+            for start, end in added:
+                first, last = _sample_range(start, end, self.rate, total)
+                if last > first:
+                    _render_interval(self.samples, first, last, self.rate,
+                                     redact_freq, mode, self.max_amplitude)
+        except BaseException:
+            for first, last, samples in saved:
+                self.samples[first:last] = samples
+            raise
+        self.intervals = intervals
+        self.redact_freq = redact_freq
+        self.mode = mode
+        if changed:
+            self.version += 1
+        return changed
+
+    def read(self, start=0, stop=None):
+        """
+        Returns bytes [start, stop) of the WAV file.
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        header = len(self.header)
+        data = memoryview(self.samples.reshape(-1).view(np.uint8))
+        chunk = self.header[start:stop] if start < header else b""
+        return chunk + bytes(data[max(start - header, 0):max(stop - header, 0)])
+
+
+def redact_audio_file(input_file, output_path, redaction_points,
+                      redact_freq=1000, mode="bleep", align=False):
+    """
+    Decodes an MP3 once, redacts all intervals in place and encodes once.
+
+    Args:
+        input_file (String): Path to the input MP3 file
+        output_path (String): Path to save the redacted mp3 file under
+        redaction_points (list of tuples): List of (start, end) times in
+        milliseconds for redaction
+        redact_freq (int): Frequency of the bleep tone in Hz
+        (default is 1000 Hz)
+        mode (String): "bleep" for a sine tone or "silence" for zeros
+        align (boolean): move the boundaries to the gaps between words
+        with align_intervals first
+    Returns:
+        (String): path of redacted mp3 file
+    """
+    with metrics.timer("decode_seconds", "Time to decode audio files",
+                       decoder="ffmpeg"):
+        audio = AudioSegment.from_file(input_file, format="mp3")
+    audio = redact_audio_segment(audio, redaction_points,
+                                 redact_freq=redact_freq, mode=mode,
+                                 align=align)
+    with metrics.timer("encode_seconds", "Time to encode audio files",
+                       format="mp3", encoder="ffmpeg"):
+        audio.export(output_path, format="mp3")
+    return output_path
 
 
 def redact_mp3_by_time(input_file, output_dir, id, redaction_points,
@@ -17,20 +345,82 @@ def redact_mp3_by_time(input_file, output_dir, id, redaction_points,
         milliseconds for redaction
         redact_freq (int): Frequency of the bleep tone in Hz
         (default is 1000 Hz)
-        redact_duration (int): Duration of each bleep in milliseconds
-        (default is 1000 ms)
+        redact_duration (int): Unused, kept for backwards compatibility;
+        bleeps always span their whole redaction range
     Returns:
         (String): path of redacted mp3 file
     """
-    audio = AudioSegment.from_file(input_file, format="mp3")
-    bleep = Sine(redact_freq).to_audio_segment(duration=redact_duration)
-    for start, end in redaction_points:
-        bleep_seg = bleep * ((end - start) // redact_duration + 1)
-        bleep_seg = bleep_seg[:end - start]
+    return redact_audio_file(input_file,
+                             output_dir + "/" + f"redacted_{id}.mp3",
+                             redaction_points, redact_freq=redact_freq)
+
+
+def word_redaction_points(index, positions):
+    """
+    Converts word positions into redaction points in the audio.
+
+    Args:
+        index (WordIndex): word index of the highlight
+        positions (iterable of ints): positions of the words to redact
+    Returns:
+        redaction_points (list of tuples): (start, end) times in
+        milliseconds from the start of the audio
+    """
+    real_start = index.audio_start_offset
+    redaction_points = []
+    for position in positions:
+        start, end = index.interval(position)
+        adjusted_start = (start - real_start) * 1000
+        adjusted_end = (end - real_start) * 1000
+        redaction_points.append((adjusted_start + LEAD_IN_MS,
+                                 adjusted_end + LEAD_IN_MS))
+    return redaction_points
+
+
+def lexicon_redaction_points(index, lexicon):
+    """
+    Finds every term of a lexicon in a highlight and converts the matches
+    into redaction points, a phrase becoming a single interval from its
+    first word to its last.
+
+    Args:
+        index (WordIndex): word index of the highlight
+        lexicon (RedactionLexicon): words, phrases and patterns to redact
+    Returns:
+        redaction_points (list of tuples): sorted, merged (start, end)
+        times in milliseconds from the start of the audio
+    """
+    redaction_points = []
+    for first, last in lexicon.spans(index.words):
+        (start, _), (_, end) = word_redaction_points(index, (first, last))
+        redaction_points.append((start, end))
+    return merge_intervals(redaction_points)
 
-        audio = audio[:start] + bleep_seg + audio[end:]
-    audio.export(output_dir + "/" + f"redacted_{id}.mp3", format="mp3")
-    return output_dir + "/" + f"redacted_{id}.mp3"
+
+def redaction_points_for(input_json, words):
+    """
+    Returns the redaction points of a selection made in the redaction UI.
+
+    Args:
+        input_json (String): Path to .json file of the highlight
+        words (list): transcript indices (ints) of single words, or words
+        and phrases (Strings) to redact wherever they are said
+    Returns:
+        redaction_points (list of tuples): (start, end) times in
+        milliseconds from the start of the audio
+    Raises:
+        ValueError: if words mixes types or an index is out of range
+    """
+    index = load_word_index(input_json)
+    if words and isinstance(words[0], int):
+        if not all(type(word) is int and 0 <= word < len(index)
+                   for word in words):
+            raise ValueError(f"Word indices must be integers from 0 to "
+                             f"{len(index) - 1}")
+        return word_redaction_points(index, words)
+    if not all(isinstance(word, str) for word in words):
+        raise ValueError("Words must all be indices or all be strings")
+    return lexicon_redaction_points(index, RedactionLexicon(words))
 
 
 def redact_mp3_by_single_words(input_audio, input_json, output_dir, id,
@@ -50,152 +440,146 @@ def redact_mp3_by_single_words(input_audio, input_json, output_dir, id,
     Returns:
         (String): path of redacted mp3 file
     """
-    audio = AudioSegment.from_file(input_audio, format="mp3")
-    with open(input_json, 'r') as file:
-        data = json.load(file)
-    mappings = gen_words_timestamps(input_json)
-    transcript = generate_transcript(input_json).split(" ")
-    real_start = data['audio_start_offset']
-    for index in redacted_indeces:
-        word = transcript[index]
-        for instance in mappings[word]:
-            if instance[2] != index:
-                continue
-            start = instance[0]
-            end = instance[1]
-            duration = (end - start) * 1000
-            print(start, end, duration)
-            bleep = Sine(redact_freq).to_audio_segment(duration=duration)
-            adjusted_start = (start - real_start) * 1000
-            adjusted_end = (end - real_start) * 1000
-            audio = audio[:adjusted_start+1000] + bleep + audio[adjusted_end+1000:]
-    audio.export(output_dir + "/" + f"redacted_{id}_" + datetime.now().strftime('%H:%M:%S') + ".mp3", format="mp3")
-    return output_dir + "/" + f"redacted_{id}_" + datetime.now().strftime('%H:%M:%S') + ".mp3"
+    redaction_points = word_redaction_points(load_word_index(input_json),
+                                             redacted_indeces)
+    output_path = output_dir + "/" + f"redacted_{id}_" + \
+        datetime.now().strftime('%H:%M:%S') + ".mp3"
+    return redact_audio_file(input_audio, output_path, redaction_points,
+                             redact_freq=redact_freq, align=True)
 
 
 def redact_mp3_by_words(input_audio, input_json, output_dir, id,
                         redacted_words, redact_freq=1000):
     """
-    Redact an MP3 file by replacing every instance of a word with a bleep tone.
+    Redact an MP3 file by replacing every instance of a word or phrase with
+    a bleep tone.
 
     Args:
         input_audio (String): Path to the input MP3 file
         input_json (String): Path to .json file of the highlight
         output_dir (String): Directory to save the mp3 file under
-        redaction_words (list of Strings): List of words that should be redacted
+        redaction_words (list of Strings or RedactionLexicon): words and
+        phrases that should be redacted, matched regardless of case and
+        punctuation
         redact_freq (int): Frequency of the bleep tone in Hz
         (default is 1000 Hz)
-        redact_duration (int): Duration of each bleep in milliseconds
-        (default is 1000 ms)
     Returns:
         (String): path of redacted mp3 file
     """
-    audio = AudioSegment.from_file(input_audio, format="mp3")
-    mappings = gen_words_timestamps(input_json)
-    with open(input_json, 'r') as file:
-        data = json.load(file)
-    real_start = data['audio_start_offset']
-    for word in redacted_words:
-        for instance in mappings[word]:
-            start = instance[0]
-            end = instance[1]
-            duration = (end - start) * 1000
-            print(start, end, duration)
-            bleep = Sine(redact_freq).to_audio_segment(duration=duration)
-            adjusted_start = (start - real_start) * 1000
-            adjusted_end = (end - real_start) * 1000
-            audio = audio[:adjusted_start+1000] + bleep + audio[adjusted_end+1000:]
-    audio.export(output_dir + "/" + f"redacted_{id}_" + datetime.now().strftime('%H:%M:%S') + ".mp3", format="mp3")
-    return output_dir + "/" + f"redacted_{id}_" + datetime.now().strftime('%H:%M:%S') + ".mp3"
+    if not isinstance(redacted_words, RedactionLexicon):
+        redacted_words = RedactionLexicon(redacted_words)
+    redaction_points = lexicon_redaction_points(load_word_index(input_json),
+                                                redacted_words)
+    output_path = output_dir + "/" + f"redacted_{id}_" + \
+        datetime.now().strftime('%H:%M:%S') + ".mp3"
+    return redact_audio_file(input_audio, output_path, redaction_points,
+                             redact_freq=redact_freq, align=True)
 
 
 def gen_words_timestamps(input_json):
     """
     Return a dictionary mapping each word to its start and end time.
+    Kept for older callers, new code should use load_word_index directly.
     
     Args:
         input_json (String): Path to .json file
     Returns:
-        mapping (Dictionary): key: word, value: dictionary containing
-        start and end times
+        mapping (Dictionary): key: word, value: set of (start, end, index)
+        tuples
     """
-    with open(input_json, 'r') as file:
-        data = json.load(file)
+    index = load_word_index(input_json)
     mapping = {}
-    index = 0
-    for group in data["snippets"][0]['words']:
-        if group['word'] not in mapping:
-            mapping[group['word']] = set()
-            mapping[group['word']].add((group['start'], group['end'], index))
-            index += 1
-        else:
-            mapping[group['word']].add((group['start'], group['end'], index))
-            index += 1
+    for position, word in enumerate(index.words):
+        start, end = index.interval(position)
+        mapping.setdefault(word, set()).add((start, end, position))
     return mapping
 
 
-def _keep_words_before_time(words, end_time):
+def transcript_redaction_ranges(index, redaction_points):
     """
-    Given a list of words with timings, keep only words
-    that end before end_time
+    Converts redaction points in the audio back into transcript times, the
+    inverse of word_redaction_points, so a transcript can be redacted
+    exactly where its audio was.
+
+    Args:
+        index (WordIndex): word index of the highlight
+        redaction_points (list of tuples): (start, end) times in
+        milliseconds from the start of the audio
+    Returns:
+        ranges (list of tuples): (start, end) transcript times in seconds
     """
-    last_keep_word = 0
-    # lets find the last word we can keep
-    for i, word in enumerate(words):
-        # find first word that ends after keep window
-        if word['start'] > end_time:
-            # found first word we have to cut
-            last_keep_word = i
-            break
-        else:
-            last_keep_word = len(words)
-    # remove words that end after keep window
-    return words[0:last_keep_word]
+    real_start = index.audio_start_offset
+    return [((start - LEAD_IN_MS) / 1000 + real_start,
+             (end - LEAD_IN_MS) / 1000 + real_start)
+            for start, end in redaction_points]
 
 
-def _keep_words_after_time(words, start_time):
+def _reco_text(reco_words):
+    output = ""
+    for w in reco_words:
+        if '[redacted]' in w:
+            output += '[redacted]' + " "
+            continue
+        output += w['word'] + " "
+    return output.strip()
+
+
+def redact_transcript(snippets, redaction_ranges):
     """
-    Given a list of words with timings, keep only words
-    that start after start_time
+    Rewrites the reco_words of every snippet for many redactions at once.
+    The ranges are merged into a sorted list, then every word of every
+    snippet is checked against it with a binary search in a single pass.
+    A word is redacted when its midpoint falls in a range, so a word whose
+    own interval was bleeped is always removed while neighbours that barely
+    touch the range are kept. The words of a range are replaced by a single
+    [redacted] entry with the range as its timings, in the snippet where
+    the range's first redacted word was.
+
+    Args:
+        snippets (list of Dictionaries): snippets of a Fora highlight, their
+        reco_words are replaced in place
+        redaction_ranges (list of tuples): (start, end) transcript times in
+        seconds, may overlap and be unsorted
+    Returns:
+        inserted (list of tuples): merged ranges that redacted any word
+        texts (list of Strings): redacted text of every snippet
     """
-    # find the first word we can keep
-    first_keep_word = 0
-    for i, word in enumerate(words):
-        # find first word that starts inside keep window
-        if word['end'] >= start_time:
-            # first word we can keep
-            first_keep_word = i
-            break
-        else:
-            first_keep_word = len(words)
-    # remove words that started before keep window
-    return words[first_keep_word:]
+    ranges = merge_intervals(redaction_ranges)
+    ends = [end for _, end in ranges]
+    inserted = set()
+    texts = []
+    for snippet in snippets:
+        reco_words = []
+        for word in snippet["words"]:
+            middle = (word['start'] + word['end']) / 2
+            i = bisect.bisect_left(ends, middle)
+            if i == len(ranges) or middle < ranges[i][0]:
+                reco_words.append(word)
+                continue
+            if i not in inserted:
+                start, end = ranges[i]
+                reco_words.append(["[redacted]", start, end, 1])
+                inserted.add(i)
+        # modify reco_words field in place
+        snippet["reco_words"] = reco_words
+        texts.append(_reco_text(reco_words))
+    return [ranges[i] for i in sorted(inserted)], texts
 
 
 def redact_reco_words(snippets, redaction_start, redaction_end):
     """
     given a list of snippets and redaction timings, removes reco_words
     that fall between those timings and replaces them with a single instance
-    of the [redacted] keyword, with redaction timings as "word" timings
+    of the [redacted] keyword, with redaction timings as "word" timings.
+    Kept for older callers, redact_transcript takes many ranges at once.
+
+    Returns:
+        redaction_inserted (boolean): True if any word was redacted
+        output (String): redacted text of all snippets
     """
-    redaction_inserted = False
-    for snippet in snippets:
-        unredacted = snippet["words"]
-        pre_redaction = _keep_words_before_time(unredacted, redaction_start)
-        post_redaction = _keep_words_after_time(unredacted, redaction_end)
-        # in the first snippet affected by the redaction, insert [redacted]
-        if not redaction_inserted and len(pre_redaction) < len(unredacted):
-            pre_redaction.append(["[redacted]", redaction_start, redaction_end, 1])
-            redaction_inserted = True
-        # modify reco_words field in place
-        snippet["reco_words"] = pre_redaction + post_redaction
-    output = ""
-    for w in snippet['reco_words']:
-        if '[redacted]' in w:
-            output += '[redacted]' + " "
-            continue
-        output += w['word'] + " "
-    return redaction_inserted, output.strip()
+    inserted, texts = redact_transcript(snippets,
+                                        [(redaction_start, redaction_end)])
+    return bool(inserted), " ".join(text for text in texts if text)
 
 
 if __name__ == "__main__":
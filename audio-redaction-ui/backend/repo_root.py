@@ -0,0 +1,10 @@
+import os
+import sys
+
+# modules shared with the tools in the repository root, e.g. metrics and
+# conversation_highlight, are imported from there instead of being copied
+# into the backend
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -31,6 +31,27 @@ const TranscriptDisplay = ({ transcript, redactedAudio, setRedactedAudio }) => {
     setSelectAll(false);
   }
 
+  // Long-polls a redaction job until it finishes, resolving with its result
+  const waitForJob = (jobId, version) => {
+    const query = version === undefined ? "wait=25" : `wait=25&version=${version}`;
+    return fetch(`http://127.0.0.1:5000/api/jobs/${jobId}?${query}`)
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error("Lost track of the redaction job.");
+        }
+        return response.json();
+      })
+      .then((job) => {
+        if (job.status === "done") {
+          return job.result;
+        }
+        if (job.status === "failed" || job.status === "cancelled") {
+          throw new Error(job.error || `Redaction ${job.status}.`);
+        }
+        return waitForJob(jobId, job.version);
+      });
+  };
+
   const redact = () => {
     if (selectedWords.length === 0) {
       alert("Please select words to redact.");
@@ -50,11 +71,12 @@ const TranscriptDisplay = ({ transcript, redactedAudio, setRedactedAudio }) => {
         }
         return response.json();
       })
+      .then((job) => waitForJob(job.jobId))
       .then((data) => {
         alert("Redacted audio successfully created!");
-        // Optionally, handle the redacted audio file path
-        setRedactedAudio(`http://localhost:9000${data.filePath}`);
-        console.log("Redacted audio file path:", data.filePath);
+        // The backend streams the redacted audio of the job
+        setRedactedAudio(`http://127.0.0.1:5000${data.audioUrl}`);
+        console.log("Redacted audio URL:", data.audioUrl);
       })
       .catch((error) => {
         console.error("Error during redaction:", error);
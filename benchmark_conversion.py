@@ -0,0 +1,80 @@
+import argparse
+import tempfile
+import time
+from conversion_backends import (
+    ConversionBackend,
+    get_backend,
+    register_backend
+)
+from rate_limit import get_limiter
+import voice_conversion as vc
+
+
+class MockVoice:
+    def __init__(self, number):
+        self.voice_id = f"mock-{number}"
+        self.name = f"Mock{number}"
+        self.labels = {}
+
+
+@register_backend("mock")
+class MockBackend(ConversionBackend):
+    """
+    Stands in for a remote conversion API, answering every conversion
+    after a fixed latency with the input audio.
+    """
+    limiter_name = "mock"
+    latency = 0.5
+
+    def voices(self):
+        return [MockVoice(number) for number in range(20)]
+
+    def convert(self, audio_file, voice, model_id, output_format,
+                request_options=None):
+        data = audio_file.read()
+        time.sleep(self.latency)
+        return [data]
+
+
+def main(input_audio, backend, voice_count, latency, worker_counts, rate):
+    get_limiter("mock", rate=rate, burst=max(worker_counts))
+    MockBackend.latency = latency
+    voices = get_backend(backend).voices()
+    voices = (voices * voice_count)[:voice_count]
+    print(f"{voice_count} conversions with the {backend} backend")
+    print(f"{'workers':>8} {'seconds':>8} {'conversions/sec':>16}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for workers in worker_counts:
+            begin = time.perf_counter()
+            results = vc.write_all_output_voices(output_dir, input_audio,
+                                                 cache_dir=None,
+                                                 workers=workers,
+                                                 voices=voices,
+                                                 backend=backend)
+            elapsed = time.perf_counter() - begin
+            failed = [voice_id for voice_id, result in results.items()
+                      if isinstance(result, Exception)]
+            if failed:
+                print(f"failed conversions: {failed}")
+            print(f"{workers:>8} {elapsed:>8.2f} "
+                  f"{voice_count / elapsed:>16.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="benchmark write_all_output_voices against a mock "
+                    "conversion API or the local engine")
+    parser.add_argument("--input-audio",
+                        default="testing/highlight-5300643.mp3")
+    parser.add_argument("--backend", default="mock",
+                        help="mock, local or any registered backend")
+    parser.add_argument("--voices", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="seconds per conversion of the mock backend")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 4, 8, 20])
+    parser.add_argument("--rate", type=float, default=100.0,
+                        help="requests/sec allowed by the mock's limiter")
+    args = parser.parse_args()
+    main(args.input_audio, args.backend, args.voices, args.latency,
+         args.workers, args.rate)
@@ -0,0 +1,61 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from pydub import AudioSegment
+from pydub.utils import which
+from conversation_highlight import EncoderPool, encode_audio
+
+
+def encode_with_pydub(ndarray, output_path, samp_rate):
+    """
+    The previous ndarray_to_mp3 path, kept here as the baseline: int16
+    conversion, an AudioSegment and one ffmpeg subprocess per file.
+    """
+    ndarray = (np.clip(ndarray, -1, 1) * 32767).astype(np.int16)
+    audio = AudioSegment(data=ndarray.tobytes(), sample_width=2,
+                         frame_rate=samp_rate, channels=1)
+    audio.export(output_path, format="mp3")
+
+
+def main(files, seconds, samp_rate, formats, workers):
+    rng = np.random.default_rng(0)
+    arrays = [(rng.random(int(seconds * samp_rate), dtype=np.float32) - 0.5)
+              for _ in range(files)]
+    print(f"{files} files of {seconds} s at {samp_rate} Hz")
+    print(f"{'encoder':>24} {'files/sec':>10}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        def report(name, run):
+            begin = time.perf_counter()
+            run()
+            print(f"{name:>24} {files / (time.perf_counter() - begin):>10.2f}")
+
+        if which("ffmpeg"):
+            report("pydub + ffmpeg (mp3)", lambda: [
+                encode_with_pydub(y, os.path.join(output_dir, f"{i}.mp3"),
+                                  samp_rate)
+                for i, y in enumerate(arrays)])
+        for format in formats:
+            report(f"in-process ({format})", lambda: [
+                encode_audio(y, os.path.join(output_dir, f"{i}.{format}"),
+                             samp_rate)
+                for i, y in enumerate(arrays)])
+            with EncoderPool(workers) as pool:
+                report(f"pool x{workers} ({format})", lambda: pool.encode_all(
+                    (y, os.path.join(output_dir, f"{i}.{format}"), samp_rate)
+                    for i, y in enumerate(arrays)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="benchmark audio encoding throughput in files/sec")
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--formats", nargs="+",
+                        default=["wav", "mp3", "opus"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    main(args.files, args.seconds, args.sample_rate, args.formats,
+         args.workers)
@@ -1,8 +1,98 @@
 import librosa
 import matplotlib.pyplot as plt
+import hashlib
 import json
+import os
+import string
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
+import soundfile as sf
 from pydub import AudioSegment
+import metrics
+
+DECODE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vc",
+                                "decoded")
+# librosa's default, soxr_mq and soxr_lq are no faster for 44.1 to 16 kHz
+# and resampling is a small part of decoding anyway
+RES_TYPE = "soxr_hq"
+# size the decoded-audio cache may grow to before the least recently used
+# files are deleted
+DECODE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Fora's highlight audio starts this long before audio_start_offset, the
+# start of the first word, so word timestamps are shifted by it
+LEAD_IN_MS = 1000
+# libsndfile (format, subtype) of each output format encode_audio supports
+ENCODE_FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+    "ogg": ("OGG", "VORBIS"),
+    "opus": ("OGG", "OPUS"),
+}
+
+
+class LazyAudio:
+    """
+    Handle to the audio of a file that is only decoded on first access,
+    and then memory mapped from the decoded-audio cache.
+
+    @arg path = String, path to audio file
+    @arg samp_rate = int, sampling rate, in samples/sec
+    """
+    __slots__ = ("path", "samp_rate", "_data")
+
+    def __init__(self, path, samp_rate=16000):
+        self.path = path
+        self.samp_rate = samp_rate
+        self._data = None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def data(self):
+        """
+        Returns the audio as a (memory mapped) NumPy array, loading it on
+        first access.
+        """
+        if self._data is None:
+            self._data = mp3_to_ndarray(self.path, self.samp_rate)
+        return self._data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.data, dtype=dtype)
+
+    def slice_time(self, start, end=None):
+        """
+        Returns the audio between start and end seconds as a view, without
+        reading the rest of the file into memory.
+        """
+        first = int(start * self.samp_rate)
+        last = None if end is None else int(end * self.samp_rate)
+        return self.data[first:last]
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"LazyAudio({self.path!r}, {self.samp_rate} Hz, {state})"
+
+
+def _describe_audio(audio, samp_rate):
+    """
+    Summarizes audio for printing without dumping its samples.
+    """
+    if audio is None or isinstance(audio, LazyAudio):
+        return repr(audio)
+    return f"<{len(audio)} samples, {len(audio) / samp_rate:.1f} s " \
+        f"at {samp_rate} Hz>"
 
 
 class ConversationHighlight:
@@ -14,25 +104,34 @@ class ConversationHighlight:
     @arg transformed = boolean, if highlight is transformed
     @arg auto_gen = boolean, if highlight is auto generated
     @arg transcript = String, transcript of highlight
-    @arg audio = NumPy array, audio
+    @arg audio = NumPy array or LazyAudio, audio
     @arg conv_rec = String?
     @arg sharer_iden = String
     @arg og_hr = String?
     @arg primary_speaker_iden = String or Identity object?
     @arg add_speaker_iden = String or Identity object?
     @arg tags = String?
+    @arg samp_rate = int, sampling rate of audio, in samples/sec
+    @arg words = WordIndex, word timings of transcript
     """
+    __slots__ = ("share_location", "share_text", "transformed", "auto_gen",
+                 "transcript", "_audio", "conv_rec", "sharer_iden", "og_hr",
+                 "primary_speaker_iden", "add_speaker_iden", "tags",
+                 "samp_rate", "words")
+
     def __init__(self, share_location=None, share_text=None, 
                  transformed=False, auto_gen=False, 
                  transcript="", audio=None, conv_rec=None, 
                  sharer_iden=None, og_hr=None, 
                  primary_speaker_iden=None, add_speaker_iden=None,
-                 tags=None):
+                 tags=None, samp_rate=16000, words=None):
         self.share_location = share_location
         self.share_text = share_text
         self.transformed = transformed
         self.auto_gen = auto_gen
         self.transcript = transcript
+        # set before audio, so the rate of a LazyAudio wins
+        self.samp_rate = samp_rate
         self.audio = audio
         self.conv_rec = conv_rec
         self.sharer_iden = sharer_iden
@@ -40,6 +139,40 @@ class ConversationHighlight:
         self.primary_speaker_iden = primary_speaker_iden
         self.add_speaker_iden = add_speaker_iden
         self.tags = tags
+        self.words = words
+
+    @property
+    def audio(self):
+        """
+        Returns the audio as a NumPy array, loading a LazyAudio handle on
+        first access.
+        """
+        if isinstance(self._audio, LazyAudio):
+            return self._audio.data
+        return self._audio
+
+    @audio.setter
+    def audio(self, audio):
+        if isinstance(audio, LazyAudio):
+            self.samp_rate = audio.samp_rate
+        self._audio = audio
+
+    @property
+    def audio_handle(self):
+        """
+        Returns the audio as it was given, without loading a LazyAudio.
+        """
+        return self._audio
+
+    def audio_slice(self, start, end=None):
+        """
+        Returns the audio between start and end seconds.
+        """
+        if isinstance(self._audio, LazyAudio):
+            return self._audio.slice_time(start, end)
+        first = int(start * self.samp_rate)
+        last = None if end is None else int(end * self.samp_rate)
+        return self._audio[first:last]
 
     def __str__(self):
         """
@@ -50,15 +183,24 @@ class ConversationHighlight:
         {self.transformed},
         {self.auto_gen},
         {self.transcript},
-        {self.audio},
+        {_describe_audio(self._audio, self.samp_rate)},
         {self.conv_rec},
         {self.sharer_iden},
-        {self.og_hr},
+        {self.og_hr!r},
         {self.primary_speaker_iden},
         {self.add_speaker_iden},
         {self.tags})'''
         return output
 
+    def __repr__(self):
+        transcript = self.transcript
+        if len(transcript) > 40:
+            transcript = transcript[:37] + "..."
+        og_hr = "yes" if self.og_hr is not None else "no"
+        return f"ConversationHighlight(transcript={transcript!r}, " \
+            f"audio={_describe_audio(self._audio, self.samp_rate)}, " \
+            f"transformed={self.transformed}, og_hr={og_hr})"
+
 
 def plot_spectogram(path):
     """
@@ -81,25 +223,243 @@ def plot_spectogram(path):
     plt.show()
 
 
-def mp3_to_ndarray(path, samp_rate):
+def _decoded_cache_path(path, samp_rate, cache_dir, res_type=RES_TYPE):
+    """
+    Returns where the decoded PCM of an audio file is cached, keyed by its
+    path, modification time, size, the sampling rate and the resampler
+    """
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}:" \
+        f"{samp_rate}:{res_type}"
+    return os.path.join(cache_dir,
+                        hashlib.sha1(key.encode()).hexdigest() + ".npy")
+
+
+def _evict_decoded(cache_dir, max_bytes=DECODE_CACHE_MAX_BYTES, keep=None):
+    """
+    Deletes the least recently used files of the decoded-audio cache until
+    it fits in max_bytes. Hits touch their file, so the modification time
+    is the time of last use. The file at keep, the one just decoded, is
+    never deleted.
+    """
+    files = []
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".npy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.path != keep:
+                    files.append((stat.st_mtime_ns, stat.st_size,
+                                  entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, file_path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _decode_to_cache(path, samp_rate, cache_dir, res_type=RES_TYPE):
+    """
+    Decodes an audio file into the decoded-audio cache unless it is
+    already there.
+
+    Returns:
+        cache_path (String): path of the cached float32 .npy file
+    """
+    cache_path = _decoded_cache_path(path, samp_rate, cache_dir, res_type)
+    decodes = metrics.counter("decode_cache_total",
+                              "Decoded-audio cache lookups by result")
+    try:
+        os.utime(cache_path)
+    except FileNotFoundError:
+        decodes.inc(result="miss")
+        with metrics.timer("decode_seconds", "Time to decode audio files",
+                           decoder="librosa"):
+            y, _ = librosa.load(path, sr=samp_rate, res_type=res_type,
+                                dtype=np.float32)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.part"
+        with open(tmp_path, "wb") as file:
+            np.save(file, y)
+        os.replace(tmp_path, cache_path)
+        _evict_decoded(cache_dir, keep=cache_path)
+    else:
+        decodes.inc(result="hit")
+    return cache_path
+
+
+def _load_decoded(path, samp_rate, cache_dir, res_type=RES_TYPE,
+                  cache_path=None, attempts=3):
+    """
+    Memory maps the cached decoding of an audio file. Another process may
+    evict the .npy between the lookup and the load, so a missing file
+    counts as a miss and the audio is decoded into the cache again.
+
+    Args:
+        cache_path (String): cached file to try first, looked up if None
+        attempts (int): decodes to try before decoding without the cache
+    Returns:
+        y (numpy.ndarray): read-only memory mapped audio
+    """
+    for _ in range(attempts):
+        if cache_path is None:
+            cache_path = _decode_to_cache(path, samp_rate, cache_dir,
+                                          res_type)
+        try:
+            return np.load(cache_path, mmap_mode='r')
+        except FileNotFoundError:
+            cache_path = None
+    return mp3_to_ndarray(path, samp_rate, cache_dir=None, res_type=res_type)
+
+
+def mp3_to_ndarray(path, samp_rate, cache_dir=DECODE_CACHE_DIR,
+                   res_type=RES_TYPE):
     """
     Converts an mp3 file to a numpy 2D array.
 
+    Decoded audio is cached as float32 .npy files and returned memory
+    mapped, so loading the same file again costs no decoding and no copy.
+
     Args:
         path (String): path to audio file
         samp_rate (int): sampling rate, in samples/sec
+        cache_dir (String): directory of the decoded-audio cache, None to
+        always decode
+        res_type (String): librosa resampler, soxr_hq by default
+
+    Returns:
+        y: (numpy.ndarray): NumPy representation of 2D array, read-only
+        when it comes from the cache
+    """
+    if cache_dir is None:
+        with metrics.timer("decode_seconds", "Time to decode audio files",
+                           decoder="librosa"):
+            y, _ = librosa.load(path, sr=samp_rate, res_type=res_type,
+                                dtype=np.float32)
+        return y
+    return _load_decoded(path, samp_rate, cache_dir, res_type)
+
+
+def mp3_to_ndarrays(paths, samp_rate, workers=None,
+                    cache_dir=DECODE_CACHE_DIR, res_type=RES_TYPE):
+    """
+    Converts many mp3 files to numpy arrays, decoding them in a process pool.
+
+    Args:
+        paths (list of Strings): paths to audio files
+        samp_rate (int): sampling rate, in samples/sec
+        workers (int): number of decoding processes, one per core if None
+        cache_dir (String): directory of the decoded-audio cache, None to
+        always decode
+        res_type (String): librosa resampler, soxr_hq by default
+
+    Returns:
+        arrays (list of numpy.ndarray): decoded audio, in the order of paths
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if cache_dir is None:
+            return list(pool.map(mp3_to_ndarray, paths,
+                                 [samp_rate] * len(paths),
+                                 [None] * len(paths),
+                                 [res_type] * len(paths)))
+        cache_paths = list(pool.map(_decode_to_cache, paths,
+                                    [samp_rate] * len(paths),
+                                    [cache_dir] * len(paths),
+                                    [res_type] * len(paths)))
+    return [_load_decoded(path, samp_rate, cache_dir, res_type, cache_path)
+            for path, cache_path in zip(paths, cache_paths)]
 
+
+def _clip_audio(ndarray):
+    """
+    Clips float audio to [-1, 1] so out-of-range samples saturate instead
+    of wrapping around, copying only when something is out of range.
+    """
+    if np.issubdtype(ndarray.dtype, np.floating) and ndarray.size and \
+            (ndarray.min() < -1 or ndarray.max() > 1):
+        return np.clip(ndarray, -1, 1)
+    return ndarray
+
+
+def encode_audio(ndarray, output_path, samp_rate, format=None):
+    """
+    Encodes a NumPy array in-process with libsndfile, without an ffmpeg
+    subprocess or intermediate int16/AudioSegment copies.
+
+    Args:
+        ndarray (numpy.ndarray): audio, (samples,) or (samples, channels),
+        float in [-1, 1] or int16/int32 PCM
+        output_path (String or file): where to write the encoded audio
+        samp_rate (int): Sampling rate of the audio in Hz (opus only
+        supports 8000, 12000, 16000, 24000 and 48000)
+        format (String): one of ENCODE_FORMATS, taken from the extension of
+        output_path if None
     Returns:
-        y: (numpy.ndarray): NumPy representation of 2D array
+        output_path: Path of the saved file
+    """
+    if format is None:
+        format = os.path.splitext(str(output_path))[1].lstrip(".").lower()
+    if format not in ENCODE_FORMATS:
+        raise ValueError(f"Unsupported audio format: {format}")
+    container, subtype = ENCODE_FORMATS[format]
+    with metrics.timer("encode_seconds", "Time to encode audio files",
+                       format=format, encoder="libsndfile"):
+        sf.write(output_path, _clip_audio(ndarray), samp_rate,
+                 format=container, subtype=subtype)
+    return output_path
+
+
+class EncoderPool:
     """
-    y, _ = librosa.load(path, sr=samp_rate)
-    return y
+    Pool of threads encoding NumPy arrays with encode_audio. libsndfile
+    releases the GIL while it encodes, so files are encoded in parallel.
+
+    @arg workers = int, number of files encoded at the same time
+    """
+    def __init__(self, workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(self, ndarray, output_path, samp_rate, format=None):
+        """
+        Queues one file for encoding.
+
+        Returns:
+            (Future): resolves to output_path
+        """
+        return self.executor.submit(encode_audio, ndarray, output_path,
+                                    samp_rate, format)
+
+    def encode_all(self, jobs):
+        """
+        Encodes (ndarray, output_path, samp_rate) jobs, returning the output
+        paths in order.
+        """
+        futures = [self.submit(*job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 def ndarray_to_mp3(ndarray, output_path, samp_rate):
     """
     Converts a NumPy array to an MP3 file.
 
+    Encodes in-process with encode_audio when libsndfile supports MP3, and
+    falls back to pydub/ffmpeg otherwise.
+
     Args:
         ndarray (numpy.ndarray): 2D NumPy array representing audio data
         output_path (String): Path to save the MP3 file
@@ -107,8 +467,12 @@ def ndarray_to_mp3(ndarray, output_path, samp_rate):
     Returns:
         output_path: Path of the saved mp3 file
     """
+    if "MP3" in sf.available_formats():
+        encode_audio(ndarray, output_path, samp_rate, format="mp3")
+        print(f"MP3 file saved to {output_path}")
+        return output_path
     if np.issubdtype(ndarray.dtype, np.floating):
-        ndarray = (ndarray * 32767).astype(np.int16)
+        ndarray = (_clip_audio(ndarray) * 32767).astype(np.int16)
     if len(ndarray.shape) == 1:
         ndarray = np.expand_dims(ndarray, axis=1)
     interleaved = ndarray.flatten()
@@ -123,11 +487,193 @@ def ndarray_to_mp3(ndarray, output_path, samp_rate):
         channels=channels
     )
     # Export as MP3
-    audio.export(output_path, format="mp3")
+    with metrics.timer("encode_seconds", "Time to encode audio files",
+                       format="mp3", encoder="ffmpeg"):
+        audio.export(output_path, format="mp3")
     print(f"MP3 file saved to {output_path}")
     return output_path
 
 
+def normalize_word(word):
+    """
+    Normalizes a word for lookups, so "Gay," and "gay" share one key.
+
+    Args:
+        word (String): word as it appears in the transcript
+    Returns:
+        (String): lowercased word without surrounding punctuation
+    """
+    return word.strip(string.punctuation + string.whitespace).lower()
+
+
+def iter_snippet_words(data):
+    """
+    Streams the words of every snippet of a Fora highlight or conversation.
+
+    Args:
+        data (Dictionary): parsed Fora .json file
+    Yields:
+        (int, Dictionary, Dictionary): snippet number, snippet and word group
+    """
+    for snippet_number, snippet in enumerate(data.get("snippets", [])):
+        for group in snippet.get("words", []):
+            yield snippet_number, snippet, group
+
+
+class WordIndex:
+    """
+    Array-backed index over the words of every snippet of a Fora .json file.
+
+    Word positions match the indices of generate_transcript(...).split(" ").
+
+    @arg words = list of Strings, words in transcript order
+    @arg starts = NumPy array, start time of each word in seconds
+    @arg ends = NumPy array, end time of each word in seconds
+    @arg confidences = NumPy array, confidence of each word
+    @arg audio_start_offset = float, time in seconds where the audio starts
+    @arg snippet_numbers = NumPy array, snippet each word belongs to
+    @arg speakers = list of (speaker_id, speaker_name) tuples, one per snippet
+    @arg tags = tags of the highlight, as in the .json file
+    """
+    def __init__(self, words, starts, ends, confidences,
+                 audio_start_offset=0.0, snippet_numbers=None, speakers=None,
+                 tags=None):
+        self.words = list(words)
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.confidences = np.asarray(confidences, dtype=np.float64)
+        self.audio_start_offset = audio_start_offset
+        if snippet_numbers is None:
+            snippet_numbers = np.zeros(len(self.words), dtype=np.int32)
+        self.snippet_numbers = np.asarray(snippet_numbers, dtype=np.int32)
+        self.speakers = list(speakers) if speakers else [(None, None)]
+        self.tags = tags
+        self.positions = {}
+        for position, word in enumerate(self.words):
+            self.positions.setdefault(normalize_word(word), []).append(position)
+        self.transcript = " ".join(self.words).strip()
+
+    @classmethod
+    def from_json(cls, file_path):
+        """
+        Builds a WordIndex from a Fora .json file, walking every snippet and
+        keeping only compact columns so the parsed JSON can be freed.
+
+        Args:
+            file_path (String): path to .json file downloaded from Fora
+        Returns:
+            (WordIndex): index over the words of the highlight or conversation
+        """
+        with open(file_path, 'r') as file:
+            data = json.load(file)
+        words = []
+        starts, ends, confidences = array('d'), array('d'), array('d')
+        snippet_numbers = array('i')
+        speakers = [(snippet.get("speaker_id"), snippet.get("speaker_name"))
+                    for snippet in data.get("snippets", [])]
+        for snippet_number, _, group in iter_snippet_words(data):
+            words.append(group["word"])
+            starts.append(group["start"])
+            ends.append(group["end"])
+            confidences.append(group.get("confidence", 1.0))
+            snippet_numbers.append(snippet_number)
+        audio_start_offset = data.get("audio_start_offset")
+        if audio_start_offset is None:
+            audio_start_offset = starts[0] if starts else 0.0
+        tags = data.get("tags")
+        del data
+        return cls(words, np.frombuffer(starts, dtype=np.float64),
+                   np.frombuffer(ends, dtype=np.float64),
+                   np.frombuffer(confidences, dtype=np.float64),
+                   audio_start_offset=audio_start_offset,
+                   snippet_numbers=np.frombuffer(snippet_numbers,
+                                                 dtype=np.int32),
+                   speakers=speakers, tags=tags)
+
+    def __len__(self):
+        return len(self.words)
+
+    def lookup(self, word):
+        """
+        Returns the positions of every instance of a word, ignoring case
+        and surrounding punctuation.
+        """
+        return self.positions.get(normalize_word(word), [])
+
+    def interval(self, position):
+        """
+        Returns the (start, end) time in seconds of the word at position.
+        """
+        return float(self.starts[position]), float(self.ends[position])
+
+    def audio_times(self):
+        """
+        Returns the start and end of every word in seconds from the start
+        of the highlight audio, which begins LEAD_IN_MS before
+        audio_start_offset.
+
+        Returns:
+            (NumPy array, NumPy array): starts and ends of the words
+        """
+        offset = self.audio_start_offset - LEAD_IN_MS / 1000
+        return self.starts - offset, self.ends - offset
+
+    def positions_in_range(self, start, end):
+        """
+        Returns the positions of words overlapping the time range
+        [start, end) in seconds, found by bisecting the time columns.
+        """
+        first = int(np.searchsorted(self.ends, start, side="right"))
+        last = int(np.searchsorted(self.starts, end, side="left"))
+        return range(first, max(first, last))
+
+    def speaker(self, position):
+        """
+        Returns the (speaker_id, speaker_name) of the word at position.
+        """
+        return self.speakers[self.snippet_numbers[position]]
+
+    def speaker_turns(self):
+        """
+        Splits the transcript into consecutive runs of the same speaker.
+
+        Yields:
+            (speaker_id, speaker_name, String): speaker and text of each turn
+        """
+        turn_start = 0
+        for position in range(1, len(self.words) + 1):
+            if position < len(self.words) and \
+                    self.speaker(position) == self.speaker(turn_start):
+                continue
+            speaker_id, speaker_name = self.speaker(turn_start)
+            yield (speaker_id, speaker_name,
+                   " ".join(self.words[turn_start:position]))
+            turn_start = position
+
+
+_WORD_INDEX_CACHE = {}
+
+
+def load_word_index(file_path):
+    """
+    Returns the WordIndex of a Fora .json file, parsing it only once for as
+    long as the file is unchanged on disk.
+
+    Args:
+        file_path (String): path to .json file downloaded from Fora
+    Returns:
+        (WordIndex): cached index over the words of the highlight
+    """
+    key = os.path.abspath(file_path)
+    mtime = os.stat(key).st_mtime_ns
+    cached = _WORD_INDEX_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    index = WordIndex.from_json(key)
+    _WORD_INDEX_CACHE[key] = (mtime, index)
+    return index
+
+
 def generate_transcript(file_path):
     """
     Extracts transcript from Fora .json file of a highlight
@@ -138,9 +684,169 @@ def generate_transcript(file_path):
         transcript (String): string containing the entire transcript
         of the highlight
     """
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-    transcript = ""
-    for group in data["snippets"][0]["words"]:
-        transcript += group["word"] + " "
-    return transcript.strip()
+    return load_word_index(file_path).transcript
+
+
+def generate_speaker_transcript(file_path, anonymize=False):
+    """
+    Extracts a transcript with one line per speaker turn from a Fora .json
+    file of a highlight or a whole conversation
+
+    Args:
+        file_path (String): path to .json file downloaded from Fora
+        anonymize (boolean): replace speaker names with "Speaker 1",
+        "Speaker 2", ... in order of appearance
+    Returns:
+        transcript (String): "speaker: text" lines joined by newlines
+    """
+    aliases = {}
+    lines = []
+    for speaker_id, speaker_name, text in \
+            load_word_index(file_path).speaker_turns():
+        if anonymize:
+            key = speaker_id if speaker_id is not None else speaker_name
+            speaker_name = aliases.setdefault(key,
+                                              f"Speaker {len(aliases) + 1}")
+        lines.append(f"{speaker_name}: {text}")
+    return "\n".join(lines)
+
+
+HIGHLIGHT_MAGIC = b"VCHL"
+HIGHLIGHT_VERSION = 1
+_ALIGNMENT = 64
+_METADATA_FIELDS = ("share_location", "share_text", "transformed",
+                    "auto_gen", "transcript", "conv_rec", "sharer_iden",
+                    "primary_speaker_iden", "add_speaker_iden", "tags",
+                    "samp_rate")
+
+
+def _jsonable(value):
+    """
+    Returns value if it can be written as JSON, else its string form, so
+    e.g. Identity objects don't stop a highlight from being saved.
+    """
+    try:
+        json.dumps(value)
+        return value
+    except TypeError:
+        return str(value)
+
+
+def _highlight_metadata(highlight):
+    """
+    Returns the JSON header fields of a highlight, following og_hr so the
+    lineage is kept. Original highlights are stored without their audio,
+    except for the path of a LazyAudio handle.
+    """
+    metadata = {field: _jsonable(getattr(highlight, field))
+                for field in _METADATA_FIELDS}
+    handle = highlight.audio_handle
+    if isinstance(handle, LazyAudio):
+        metadata["audio_path"] = os.path.abspath(handle.path)
+    if highlight.og_hr is not None:
+        metadata["og_hr"] = _highlight_metadata(highlight.og_hr) \
+            if isinstance(highlight.og_hr, ConversationHighlight) \
+            else _jsonable(highlight.og_hr)
+    return metadata
+
+
+def _highlight_from_metadata(metadata, audio=None, words=None):
+    fields = {field: metadata.get(field) for field in _METADATA_FIELDS}
+    fields["samp_rate"] = fields["samp_rate"] or 16000
+    if audio is None and metadata.get("audio_path"):
+        audio = LazyAudio(metadata["audio_path"], fields["samp_rate"])
+    og_hr = metadata.get("og_hr")
+    if isinstance(og_hr, dict):
+        og_hr = _highlight_from_metadata(og_hr)
+    return ConversationHighlight(audio=audio, og_hr=og_hr, words=words,
+                                 **fields)
+
+
+def save_highlight(highlight, path):
+    """
+    Writes a Conversation Highlight to a single binary file: a magic
+    number, a JSON header (metadata, og_hr lineage, words, speakers and
+    the layout of the columns) and 64-byte aligned raw columns for the
+    word timings and the float32 PCM audio.
+
+    Args:
+        highlight (ConversationHighlight): highlight to save
+        path (String): path of the file to write
+    Returns:
+        path (String): path of the written file
+    """
+    columns = []
+    words = highlight.words
+    if words is not None:
+        columns += [("starts", words.starts), ("ends", words.ends),
+                    ("confidences", words.confidences),
+                    ("snippet_numbers", words.snippet_numbers)]
+    if highlight.audio is not None:
+        columns.append(("audio", np.asarray(highlight.audio,
+                                            dtype=np.float32)))
+    header = {"metadata": _highlight_metadata(highlight), "columns": []}
+    if words is not None:
+        header["words"] = {"words": words.words,
+                           "speakers": words.speakers,
+                           "audio_start_offset": words.audio_start_offset}
+    offset = 0
+    for name, column in columns:
+        header["columns"].append({"name": name, "dtype": column.dtype.str,
+                                  "shape": list(column.shape),
+                                  "offset": offset})
+        offset += -(-column.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header_bytes = json.dumps(header).encode()
+    prefix = struct.pack("<4sHQ", HIGHLIGHT_MAGIC, HIGHLIGHT_VERSION,
+                         len(header_bytes))
+    data_start = -(-(len(prefix) + len(header_bytes)) // _ALIGNMENT) * \
+        _ALIGNMENT
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "wb") as file:
+        file.write(prefix)
+        file.write(header_bytes)
+        for (name, column), layout in zip(columns, header["columns"]):
+            file.seek(data_start + layout["offset"])
+            file.write(np.ascontiguousarray(column).data)
+        file.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_highlight(path):
+    """
+    Reads a Conversation Highlight written by save_highlight. Word timings
+    and audio are memory mapped from the file, not copied.
+
+    Args:
+        path (String): path of the file to read
+    Returns:
+        (ConversationHighlight): the saved highlight
+    """
+    with open(path, "rb") as file:
+        prefix = file.read(struct.calcsize("<4sHQ"))
+        magic, version, header_length = struct.unpack("<4sHQ", prefix)
+        if magic != HIGHLIGHT_MAGIC:
+            raise ValueError(f"{path} is not a saved highlight")
+        if version > HIGHLIGHT_VERSION:
+            raise ValueError(f"{path} uses unsupported version {version}")
+        header = json.loads(file.read(header_length))
+    data_start = -(-(len(prefix) + header_length) // _ALIGNMENT) * _ALIGNMENT
+    columns = {}
+    for layout in header["columns"]:
+        shape = tuple(layout["shape"])
+        if 0 in shape:
+            columns[layout["name"]] = np.empty(shape, dtype=layout["dtype"])
+            continue
+        columns[layout["name"]] = np.memmap(
+            path, dtype=layout["dtype"], mode="r",
+            offset=data_start + layout["offset"], shape=shape)
+    words = None
+    if "words" in header:
+        words = WordIndex(header["words"]["words"], columns["starts"],
+                          columns["ends"], columns["confidences"],
+                          header["words"]["audio_start_offset"],
+                          columns["snippet_numbers"],
+                          [tuple(speaker)
+                           for speaker in header["words"]["speakers"]])
+    return _highlight_from_metadata(header["metadata"],
+                                    audio=columns.get("audio"), words=words)
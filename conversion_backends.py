@@ -0,0 +1,204 @@
+import io
+import threading
+import librosa
+import numpy as np
+from pydub import AudioSegment
+
+BACKENDS = {}
+_INSTANCES = {}
+_INSTANCES_LOCK = threading.Lock()
+
+
+def register_backend(name):
+    """
+    Class decorator adding a ConversionBackend to the registry under name.
+    """
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_backend(name):
+    """
+    Returns the shared instance of a registered backend, creating it on
+    first use so backends that aren't used never import their client.
+
+    Args:
+        name (String): name the backend was registered under
+    Returns:
+        (ConversionBackend): backend instance
+    """
+    with _INSTANCES_LOCK:
+        if name not in _INSTANCES:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown conversion backend: {name}")
+            _INSTANCES[name] = BACKENDS[name]()
+        return _INSTANCES[name]
+
+
+class ConversionBackend:
+    """
+    Interface of a speech-to-speech engine, modelled on the ElevenLabs
+    client so voice_conversion can treat every engine alike.
+
+    limiter_name is the shared rate limiter the backend's calls go
+    through, None for backends that don't need one.
+    """
+    name = None
+    limiter_name = None
+
+    def voices(self):
+        """
+        Returns:
+            voices (list): objects with voice_id, name and labels
+        """
+        raise NotImplementedError
+
+    def convert(self, audio_file, voice, model_id, output_format,
+                request_options=None):
+        """
+        Converts audio to the given voice.
+
+        Args:
+            audio_file (file): open binary file of the input audio
+            voice (Voice): one of voices()
+            model_id (String): model to convert with, if the engine has any
+            output_format (String): one of voice_conversion.OUTPUT_FORMATS
+            request_options (Dictionary): e.g. {"timeout_in_seconds": 30}
+        Returns:
+            (iterable of bytes): converted audio in output_format
+        """
+        raise NotImplementedError
+
+
+@register_backend("elevenlabs")
+class ElevenLabsBackend(ConversionBackend):
+    """
+    Remote conversion through the ElevenLabs speech-to-speech API.
+    """
+    limiter_name = "elevenlabs"
+
+    def __init__(self):
+        from elevenlabs import ElevenLabs
+        import apikey
+        self.client = ElevenLabs(
+            api_key=apikey.API_KEY,
+        )
+
+    def voices(self):
+        voices = []
+        for voice in self.client.voices.get_all():
+            for v in voice[1]:
+                voices.append(v)
+        return voices
+
+    def convert(self, audio_file, voice, model_id, output_format,
+                request_options=None):
+        return self.client.speech_to_speech.convert(
+            voice_id=voice.voice_id,
+            audio=audio_file,
+            output_format=output_format,
+            model_id=model_id,
+            request_options=request_options,
+        )
+
+
+class LocalVoice:
+    """
+    Preset of the local engine.
+
+    @arg voice_id = String, ID of the preset
+    @arg name = String, name of the preset
+    @arg pitch = float, pitch shift in semitones
+    @arg warp = float, factor the spectral envelope (formants) is scaled by
+    @arg labels = Dictionary, gender/accent/age labels like ElevenLabs voices
+    """
+    def __init__(self, voice_id, name, pitch, warp, labels=None):
+        self.voice_id = voice_id
+        self.name = name
+        self.pitch = pitch
+        self.warp = warp
+        self.labels = labels or {}
+
+
+def warp_spectral_envelope(y, factor, n_fft=1024, hop_length=256,
+                           lifter=40):
+    """
+    Scales the spectral envelope of a signal along the frequency axis while
+    keeping its fine (pitch) structure, moving the formants that carry much
+    of a speaker's vocal identity. The envelope is taken from the low
+    quefrencies of the cepstrum of every frame at once.
+
+    Args:
+        y (numpy.ndarray): mono audio
+        factor (float): > 1 moves formants up, < 1 moves them down
+        n_fft (int): STFT window size
+        hop_length (int): STFT hop size
+        lifter (int): number of cepstral coefficients kept for the envelope
+    Returns:
+        (numpy.ndarray): warped audio with the same length as y
+    """
+    spectrum = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+    magnitude = np.abs(spectrum) + 1e-10
+    cepstrum = np.fft.irfft(np.log(magnitude), axis=0)
+    cepstrum[lifter:-lifter] = 0
+    envelope = np.exp(np.fft.rfft(cepstrum, axis=0).real)
+    # envelope value of bin k moves to bin k * factor
+    source = np.arange(envelope.shape[0]) / factor
+    lower = np.clip(np.floor(source).astype(int), 0, envelope.shape[0] - 1)
+    upper = np.clip(lower + 1, 0, envelope.shape[0] - 1)
+    weight = (source - lower)[:, np.newaxis]
+    warped = envelope[lower] * (1 - weight) + envelope[upper] * weight
+    spectrum = spectrum / envelope * warped
+    return librosa.istft(spectrum, hop_length=hop_length, length=len(y))
+
+
+def _sample_rate(output_format):
+    # e.g. mp3_44100_128, pcm_16000, ulaw_8000
+    return int(output_format.split("_")[1])
+
+
+@register_backend("local")
+class LocalBackend(ConversionBackend):
+    """
+    Offline CPU engine: pitch shift plus spectral envelope warping over
+    NumPy/librosa. Much cruder than a neural model, but needs no network
+    and runs at a reproducible speed.
+    """
+    VOICES = [
+        LocalVoice("local-low", "Low", -4.0, 0.88,
+                   {"gender": "male", "age": "old"}),
+        LocalVoice("local-mid-low", "MidLow", -2.0, 0.94,
+                   {"gender": "male", "age": "middle-aged"}),
+        LocalVoice("local-mid-high", "MidHigh", 2.0, 1.06,
+                   {"gender": "female", "age": "middle-aged"}),
+        LocalVoice("local-high", "High", 4.0, 1.12,
+                   {"gender": "female", "age": "young"}),
+    ]
+
+    def voices(self):
+        return list(self.VOICES)
+
+    def convert(self, audio_file, voice, model_id=None,
+                output_format="mp3_44100_128", request_options=None):
+        samp_rate = _sample_rate(output_format)
+        y, _ = librosa.load(audio_file, sr=samp_rate, mono=True)
+        if voice.pitch:
+            y = librosa.effects.pitch_shift(y, sr=samp_rate,
+                                            n_steps=voice.pitch)
+        if voice.warp != 1:
+            y = warp_spectral_envelope(y, voice.warp)
+        pcm = (np.clip(y, -1, 1) * 32767).astype(np.int16)
+        if output_format.startswith("pcm_"):
+            return [pcm.tobytes()]
+        segment = AudioSegment(data=pcm.tobytes(), sample_width=2,
+                               frame_rate=samp_rate, channels=1)
+        output = io.BytesIO()
+        if output_format.startswith("ulaw_"):
+            segment.export(output, format="wav", codec="pcm_mulaw")
+        else:
+            segment.export(output, format="mp3",
+                           bitrate=f"{output_format.split('_')[2]}k")
+        return [output.getvalue()]
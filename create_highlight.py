@@ -1,71 +1,71 @@
-import conversation_highlight as ch
-import voice_conversion as vc
-import fetch_conversations as fetch
 import argparse
+import time
 from pathlib import Path
-import json
-from conversation_highlight import ConversationHighlight
+import pipeline
+
+
+def local_items(input_dir, ids=None):
+    """
+    Returns pipeline items for the highlights already downloaded to a
+    directory, optionally only the given IDs.
+    """
+    items = []
+    for audio_path in sorted(Path(input_dir).glob("highlight-*.mp3")):
+        id = audio_path.stem[len("highlight-"):]
+        json_file = Path(input_dir) / f"conversation-{id}.json"
+        if json_file.exists() and (not ids or id in ids):
+            items.append({"id": id, "json_file": json_file,
+                          "audio_path": audio_path})
+    return items
 
 
 if __name__ == "__main__":
-    response = input("command line or local file: ")
-    if response == "command line":
-        cmd_input = input("enter args:")
-        parser = argparse.ArgumentParser(description="enter command")
-        parser.add_argument("--api-key", required=True)
-        parser.add_argument("--output-directory", required=True, type=Path)
-        parser.add_argument("--type", required=True)
-        parser.add_argument("--id", required=True)
-        args = parser.parse_args()
-        
-        json_file, audio_path = fetch.main(args.type, args.id, args.api_key, args.output_directory)
-        #create conversation highlight object
-        numpy_array = ch.mp3_to_ndarray(audio_path, 16000)
-        transcript = ch.generate_transcript(json_file)
-        with open(json_file, 'r') as file:
-            data = json.load(file)
-        highlight = ConversationHighlight(
-            share_location=None,
-            share_text=None,
-            transformed=False,
-            auto_gen=False,
-            transcript=transcript,
-            audio=numpy_array,
-            conv_rec=None,
-            sharer_iden=None,
-            og_hr=None,
-            primary_speaker_iden=None,
-            add_speaker_iden=None,
-            tags=data['tags']
-        )
-        print(highlight)
-        converted_highlight = vc.main(args.output_directory, highlight, 
-                                      audio_path, args.id)
-        r.redact_mp3_by_words(audio_path, json_file, "testing", id=args.id,
-                              redacted_words=['gay'])
-        print(converted_highlight)
-        
-    elif response == "local file":
-        json_file = input("enter path of json.file: ")
-        audio_path = input("enter path of mp3 file: ")
-        numpy_array = ch.mp3_to_ndarray(audio_path, 16000)
-        transcript = ch.generate_transcript(json_file)
-        with open(json_file, 'r') as file:
-            data = json.load(file)
-        highlight = ConversationHighlight(
-            share_location=None,
-            share_text=None,
-            transformed=False,
-            auto_gen=False,
-            transcript=transcript,
-            audio=numpy_array,
-            conv_rec=None,
-            sharer_iden=None,
-            og_hr=None,
-            primary_speaker_iden=None,
-            add_speaker_iden=None,
-            tags=data['tags']
-        )
-        print(highlight)
-        converted_highlight = vc.main("testing", highlight, audio_path)
-        print(converted_highlight)
+    parser = argparse.ArgumentParser(
+        description="fetch, decode, convert and redact highlights")
+    parser.add_argument("--output-directory", required=True, type=Path)
+    parser.add_argument("--id", nargs="+", default=[],
+                        help="highlight IDs to fetch, or to pick from "
+                             "--input-dir")
+    parser.add_argument("--api-key", default=None,
+                        help="Fora API Key, needed unless --input-dir is "
+                             "given")
+    parser.add_argument("--input-dir", type=Path, default=None,
+                        help="use highlight-<id>.mp3 and "
+                             "conversation-<id>.json files from here "
+                             "instead of fetching")
+    parser.add_argument("--redact", nargs="+", default=[],
+                        help="words or quoted phrases to bleep")
+    parser.add_argument("--no-convert", dest="convert",
+                        action="store_false")
+    parser.add_argument("--backend", default=pipeline.vc.BACKEND,
+                        help="voice conversion backend, e.g. elevenlabs or "
+                             "local")
+    parser.add_argument("--fetch-workers", type=int, default=4)
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--convert-workers", type=int, default=2)
+    parser.add_argument("--redact-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.input_dir is not None:
+        items = local_items(args.input_dir, set(args.id))
+    elif args.api_key is None:
+        parser.error("--api-key is required to fetch highlights")
+    else:
+        items = [{"id": id} for id in args.id]
+    if not items:
+        parser.error("no highlights to process")
+
+    highlights = pipeline.build_pipeline(
+        args.output_directory, api_key=args.api_key,
+        redacted_words=args.redact, convert=args.convert,
+        backend=args.backend, fetch_workers=args.fetch_workers,
+        decode_workers=args.decode_workers,
+        convert_workers=args.convert_workers,
+        redact_workers=args.redact_workers, queue_size=args.queue_size)
+    begin = time.perf_counter()
+    for item in highlights.run(items):
+        print(item.get("converted", item["highlight"]))
+        if "redacted" in item:
+            print(f"redacted: {item['redacted']}")
+    highlights.print_timings(time.perf_counter() - begin)
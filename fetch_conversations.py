@@ -1,16 +1,64 @@
 import json
+import os
 import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+import metrics
+from file_cache import get_cache
+from rate_limit import backoff, get_limiter, retry_after
 
+BASE_URL = "https://api.fora.io/v1"
+CACHE_DIR = Path.home() / ".cache" / "vc" / "fora"
+STATE_FILE = "fetch_state.json"
+# fetch_state.json is rewritten after this many downloads or seconds,
+# whichever comes first, and once the crawl ends
+STATE_FLUSH_ITEMS = 50
+STATE_FLUSH_SECONDS = 5.0
+FORA_RATE = 10.0
+FORA_BURST = 20
 
-def make_request(url, api_key, suffix=None):
+
+def make_session(pool_size=10):
+    """
+    Creates a requests Session that keeps up to pool_size connections
+    alive, so concurrent downloads reuse TCP/TLS connections
+
+    Args:
+        pool_size (int): number of connections kept in the pool
+
+    Returns:
+        session (Session): pooled session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def make_request(url, api_key, suffix=None, session=None, stream=False,
+                 limiter=None, max_retries=5, timeout=30, extra_headers=None):
     """
-    Makes a request to Fora API
+    Makes a request to Fora API, waiting on the shared Fora rate limiter
+    and retrying rate limited (429), server (5xx) and timed out requests
+    with jittered exponential backoff, honoring Retry-After
 
     Args:
         url (String): url that is being requested
         api_key (String): Fora API key that is in apikey.py
         suffix (String): suffix to add to end of url if needed
+        session (Session): pooled session to send the request with, a fresh
+        connection is used if None
+        stream (boolean): don't read the body until it is iterated over
+        limiter (RateLimiter): limiter to draw from, the shared "fora"
+        limiter if None
+        max_retries (int): retries before the last error is raised
+        timeout (float): seconds to wait for the server to respond
+        extra_headers (Dictionary): headers sent on top of the defaults,
+        e.g. If-None-Match
 
     Returns:
         response (Response): response object based on request
@@ -19,19 +67,257 @@ def make_request(url, api_key, suffix=None):
         "Accept": "application/json",
         "Authorization": "Bearer " + api_key,
     }
+    if extra_headers:
+        headers.update(extra_headers)
+    get = session.get if session is not None else requests.get
+    if limiter is None:
+        limiter = get_limiter("fora", rate=FORA_RATE, burst=FORA_BURST)
+    attempt = 0
     while True:
+        limiter.acquire()
         print(f"Requesting {url}" + (f" {suffix}" if suffix else ""))
-        response = requests.get(url, headers=headers)
-        if response.status_code == 429:
-            print("Hit rate limit. Sleeping for 10 seconds...")
-            time.sleep(10)
+        begin = time.perf_counter()
+        try:
+            response = get(url, headers=headers, stream=stream,
+                           timeout=timeout)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            metrics.counter("fora_requests_total",
+                            "Fora API requests by status").inc(
+                status=type(e).__name__)
+            if attempt >= max_retries:
+                limiter.record("errors")
+                raise
+            delay = backoff(attempt)
+            print(f"Request failed ({e}). Retrying in {delay:.1f} seconds...")
+            limiter.record("retries")
+            time.sleep(delay)
+            attempt += 1
             continue
-        response.raise_for_status()
-        break
-    return response
+        metrics.histogram("fora_request_seconds",
+                          "Time to the response headers of Fora API "
+                          "requests").observe(time.perf_counter() - begin)
+        metrics.counter("fora_requests_total",
+                        "Fora API requests by status").inc(
+            status=response.status_code)
+        retryable = response.status_code == 429 or \
+            response.status_code >= 500
+        if not retryable:
+            response.raise_for_status()
+            return response
+        if attempt >= max_retries:
+            limiter.record("errors")
+            response.raise_for_status()
+        delay = retry_after(response.headers)
+        if delay is None:
+            delay = backoff(attempt)
+        response.close()
+        if response.status_code == 429:
+            print(f"Hit rate limit. Retrying in {delay:.1f} seconds...")
+            limiter.throttle(delay)
+        else:
+            print(f"Server error {response.status_code}. "
+                  f"Retrying in {delay:.1f} seconds...")
+            time.sleep(delay)
+        limiter.record("retries")
+        attempt += 1
+
+
+def _write_atomic(path, chunks):
+    """
+    Writes chunks of bytes to a temporary file and renames it into place,
+    so an interrupted download never leaves a partial file behind
+    """
+    tmp_path = path.with_name(path.name + ".part")
+    with open(tmp_path, "wb") as output_file:
+        for chunk in chunks:
+            output_file.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def fetch_highlight(highlight_id, api_key, output_directory, session=None,
+                    base_url=BASE_URL, suffix=None, cache_dir=CACHE_DIR):
+    """
+    Downloads the .json and mp3 file of one highlight, streaming the audio
+    to disk in chunks. With a cache, the .json is requested with
+    If-None-Match and the audio is only downloaded again when the
+    highlight's ETag/updated_at changed
 
+    Args:
+        highlight_id (String): ID of highlight (last number in URL)
+        api_key (String): Fora API Key used to connect
+        output_directory (Path): directory that the files are saved under
+        session (Session): pooled session to send the requests with
+        base_url (String): root of the Fora API
+        suffix (String): progress suffix printed with each request
+        cache_dir (Path): directory of the download cache, None to disable
 
-def main(type_request, highlight_id, api_key, output_directory):
+    Returns:
+        .json path (Path), .mp3 path (Path):
+        paths of .json and .mp3 files, respectively
+    """
+    output_directory = Path(output_directory)
+    json_path = output_directory / f"conversation-{highlight_id}.json"
+    audio_path = output_directory / f"highlight-{highlight_id}.mp3"
+    if cache_dir is None:
+        highlight = make_request(f"{base_url}/highlights/{highlight_id}",
+                                 api_key, suffix=suffix,
+                                 session=session).json()
+        _write_atomic(json_path, [
+            json.dumps(highlight, indent=4, sort_keys=True).encode()
+        ])
+        audio = make_request(f"{base_url}/highlights/{highlight_id}/audio",
+                             api_key, suffix=suffix, session=session,
+                             stream=True)
+        with audio:
+            _write_atomic(audio_path,
+                          audio.iter_content(chunk_size=64 * 1024))
+        return json_path, audio_path
+
+    cache = get_cache(cache_dir)
+    json_key = f"highlight-{highlight_id}.json"
+    audio_key = f"highlight-{highlight_id}.mp3"
+    cached_json = cache.get(json_key)
+    extra_headers = {}
+    if cached_json is not None and cached_json[1].get("etag"):
+        extra_headers["If-None-Match"] = cached_json[1]["etag"]
+    response = make_request(f"{base_url}/highlights/{highlight_id}", api_key,
+                            suffix=suffix, session=session,
+                            extra_headers=extra_headers)
+    if response.status_code == 304:
+        stored_json, meta = cached_json
+    else:
+        highlight = response.json()
+        meta = {"etag": response.headers.get("ETag"),
+                "updated_at": highlight.get("updated_at",
+                                            highlight.get("created_at"))}
+        stored_json = cache.put(json_key, [
+            json.dumps(highlight, indent=4, sort_keys=True).encode()
+        ], meta=meta)
+    version = meta["etag"] or meta["updated_at"]
+    cached_audio = cache.get(audio_key)
+    if cached_audio is not None and version is not None and \
+            cached_audio[1].get("version") == version:
+        stored_audio = cached_audio[0]
+    else:
+        audio = make_request(f"{base_url}/highlights/{highlight_id}/audio",
+                             api_key, suffix=suffix, session=session,
+                             stream=True)
+        with audio:
+            stored_audio = cache.put(audio_key,
+                                     audio.iter_content(chunk_size=64 * 1024),
+                                     meta={"version": version})
+    return (cache.materialize(stored_json, json_path),
+            cache.materialize(stored_audio, audio_path))
+
+
+def _load_state(state_path):
+    if state_path.exists():
+        with open(state_path, "r") as file:
+            return set(json.load(file)["completed"])
+    return set()
+
+
+def _save_state(state_path, completed):
+    _write_atomic(state_path, [
+        json.dumps({"completed": sorted(completed)}).encode()
+    ])
+
+
+def fetch_all_conversations(api_key, output_directory, workers=8,
+                            base_url=BASE_URL, cache_dir=CACHE_DIR):
+    """
+    Downloads every conversation listed by the Fora API with a pool of
+    workers sharing one pooled session. The next page of the listing is
+    requested while the current page downloads, and finished IDs are
+    recorded in fetch_state.json every STATE_FLUSH_ITEMS downloads or
+    STATE_FLUSH_SECONDS so an interrupted crawl resumes where it stopped.
+
+    Args:
+        api_key (String): Fora API Key used to connect
+        output_directory (Path): directory that the files are saved under
+        workers (int): number of highlights downloaded at the same time
+        base_url (String): root of the Fora API
+        cache_dir (Path): directory of the download cache, None to disable
+
+    Returns:
+        paths (list of tuples): (.json path, .mp3 path) of every
+        conversation, in listing order
+    """
+    output_directory = Path(output_directory)
+    state_path = output_directory / STATE_FILE
+    completed = _load_state(state_path)
+    state_lock = threading.Lock()
+    state = {"unsaved": 0, "saved": time.monotonic()}
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    session = make_session(workers + 1)
+
+    def list_page(page):
+        return make_request(f"{base_url}/conversations?page={page}",
+                            api_key, session=session)
+
+    def flush_state():
+        # called with state_lock held
+        if state["unsaved"]:
+            _save_state(state_path, completed)
+            state["unsaved"] = 0
+        state["saved"] = time.monotonic()
+
+    def download(conversation_id, suffix):
+        try:
+            paths = fetch_highlight(conversation_id, api_key, output_directory,
+                                    session=session, base_url=base_url,
+                                    suffix=suffix, cache_dir=cache_dir)
+            with state_lock:
+                completed.add(conversation_id)
+                state["unsaved"] += 1
+                if state["unsaved"] >= STATE_FLUSH_ITEMS or \
+                        time.monotonic() - state["saved"] >= \
+                        STATE_FLUSH_SECONDS:
+                    flush_state()
+            return paths
+        finally:
+            in_flight.release()
+
+    ordered = []
+    futures = {}
+    try:
+        with ThreadPoolExecutor(max_workers=1) as pager, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            page = 1
+            next_page = pager.submit(list_page, page)
+            index = 1
+            while next_page is not None:
+                response = next_page.result()
+                pagination = json.loads(response.headers["X-Pagination"])
+                total = pagination["total"]
+                next_page = None
+                if page < pagination["last_page"]:
+                    page += 1
+                    next_page = pager.submit(list_page, page)
+                for conversation in response.json():
+                    conversation_id = conversation["id"]
+                    ordered.append(conversation_id)
+                    if conversation_id in completed:
+                        index += 1
+                        continue
+                    in_flight.acquire()
+                    future = pool.submit(download, conversation_id,
+                                         f"({index} / {total})")
+                    futures[future] = conversation_id
+                    index += 1
+            for future in as_completed(futures):
+                future.result()
+    finally:
+        # also keeps what finished when the crawl is interrupted
+        with state_lock:
+            flush_state()
+    return [(output_directory / f"conversation-{conversation_id}.json",
+             output_directory / f"highlight-{conversation_id}.mp3")
+            for conversation_id in ordered]
+
+
+def main(type_request, highlight_id, api_key, output_directory, workers=8,
+         base_url=BASE_URL, cache_dir=CACHE_DIR):
     """
     Makes an API request to Fora, retrieves the .json and mp3 file of the
     highlight/converation, and returns both paths
@@ -43,49 +329,23 @@ def main(type_request, highlight_id, api_key, output_directory):
         api_key (String): Fora API Key used to connect
         output_directory (String): directory that the .json and .mp3
         files should be saved under
+        workers (int): number of conversations downloaded at the same time
+        base_url (String): root of the Fora API
+        cache_dir (Path): directory of the download cache, None to disable
 
     Returns:
-        .json path (String), .mp3 path (String): 
-        paths of .json and .mp3 files, respectively
+        .json path (String), .mp3 path (String):
+        paths of .json and .mp3 files, respectively, for highlights
+        paths (list of tuples): (.json path, .mp3 path) of every conversation,
+        covering all snippets and speakers of each, for conversations
     """
     match (type_request):
         case "highlights":
-            highlight = make_request(
-                f"https://api.fora.io/v1/{type_request}/{highlight_id}",
-                api_key,
-            ).json()
-            (output_directory / f"conversation-{highlight_id}.json").write_text(
-                        json.dumps(highlight, indent=4, sort_keys=True),
-                    )
-            audio = make_request(
-                f"https://api.fora.io/v1/{type_request}/{highlight_id}/audio",
-                api_key,
-            )
-            with open(output_directory / f"highlight-{highlight_id}.mp3", "wb") as output_file:
-                for chunk in audio:
-                    output_file.write(chunk)
-            return (output_directory / f"conversation-{highlight_id}.json"), (output_directory / f"highlight-{highlight_id}.mp3")
+            return fetch_highlight(highlight_id, api_key, output_directory,
+                                   base_url=base_url, cache_dir=cache_dir)
         case "conversations":
-            page = 1
-            last_page = 1
-            total = 0
-            index = 1
-            while page <= last_page:
-                url = f"https://api.fora.io/v1/conversations?page={page}"
-                response = make_request(url, api_key)
-                last_page = json.loads(response.headers["X-Pagination"])["last_page"]
-                total = json.loads(response.headers["X-Pagination"])["total"]
-                for conversation in response.json():
-                    conversation_id = conversation["id"]
-                    conversation = make_request(
-                        f"https://api.fora.io/v1/highlights/{conversation_id}",
-                        api_key,
-                        suffix=f"({index} / {total})",
-                    ).json()
-                    (output_directory / f"conversation-{conversation_id}.json").write_text(
-                        json.dumps(conversation, indent=4, sort_keys=True),
-                    )
-                    index += 1
-                page += 1
+            return fetch_all_conversations(api_key, output_directory,
+                                           workers=workers, base_url=base_url,
+                                           cache_dir=cache_dir)
         case _:
             return
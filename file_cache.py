@@ -0,0 +1,220 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+# the index is written at most this often, and by flush at exit
+INDEX_FLUSH_SECONDS = 5.0
+# eviction frees space down to this share of max_bytes, so a full cache
+# doesn't sort its entries on every put
+EVICT_TO = 0.9
+
+
+class FileCache:
+    """
+    Content-addressed on-disk cache. Files are stored once under the
+    SHA-256 of their contents, keys point at those files, and the least
+    recently used keys are evicted once the cache grows past max_bytes.
+
+    @arg cache_dir = String or Path, directory the cache lives in
+    @arg max_bytes = int, size the stored files may grow to
+    """
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_path = self.cache_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.entries = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.dirty = False
+        self.saved = time.monotonic()
+        if self.index_path.exists():
+            with open(self.index_path, "r") as file:
+                self.entries = json.load(file)
+        # keys pointing at each stored file, and the size of all of them
+        self.refs = {}
+        self.total = 0
+        for entry in self.entries.values():
+            self._reference(entry)
+
+    def _reference(self, entry):
+        digest = entry["sha256"]
+        if digest not in self.refs:
+            self.refs[digest] = 0
+            self.total += entry["size"]
+        self.refs[digest] += 1
+
+    def _drop(self, key):
+        """
+        Removes a key, deleting its file if no other key points at it.
+        """
+        entry = self.entries.pop(key)
+        digest = entry["sha256"]
+        self.refs[digest] -= 1
+        if self.refs[digest] == 0:
+            del self.refs[digest]
+            self.total -= entry["size"]
+            self._object_path(digest).unlink(missing_ok=True)
+
+    def _touch_index(self):
+        self.dirty = True
+        if time.monotonic() - self.saved >= INDEX_FLUSH_SECONDS:
+            self._save_index()
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + ".part")
+        with open(tmp_path, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+        self.saved = time.monotonic()
+
+    def flush(self):
+        """
+        Writes the index if it changed since it was last written.
+        """
+        with self.lock:
+            if self.dirty:
+                self._save_index()
+
+    def get(self, key, verify=False):
+        """
+        Looks up a key, marking it as recently used.
+
+        Args:
+            key (String): cache key
+            verify (boolean): re-hash the stored file and drop it if it
+            doesn't match the recorded SHA-256
+        Returns:
+            (Path, Dictionary) or None: path of the stored file and the
+            metadata it was stored with, None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            path = self._object_path(entry["sha256"])
+            if not path.exists() or path.stat().st_size != entry["size"] or \
+                    (verify and file_digest(path) != entry["sha256"]):
+                self._drop(key)
+                self._touch_index()
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            entry["last_used"] = time.time()
+            self._touch_index()
+            return path, entry["meta"]
+
+    def put(self, key, chunks, meta=None):
+        """
+        Stores the bytes of chunks under key, hashing them while writing.
+
+        Args:
+            key (String): cache key
+            chunks (iterable of bytes): contents of the file
+            meta (Dictionary): JSON serializable metadata kept with the key
+        Returns:
+            (Path): path of the stored file
+        """
+        tmp_path = self.objects_dir / f"{threading.get_ident()}-{time.time_ns()}.part"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as output_file:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    output_file.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        digest = digest.hexdigest()
+        path = self._object_path(digest)
+        path.parent.mkdir(exist_ok=True)
+        # under the lock, so _evict can't unlink the file being replaced
+        with self.lock:
+            os.replace(tmp_path, path)
+            entry = {"sha256": digest, "size": size,
+                     "last_used": time.time(), "meta": meta or {}}
+            # reference the new file before dropping an old entry of the
+            # key, which may point at the same file
+            self._reference(entry)
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = entry
+            if self.total > self.max_bytes:
+                self._evict()
+            self._touch_index()
+        return path
+
+    def _evict(self):
+        """
+        Drops least recently used keys until the stored files fit in
+        EVICT_TO of max_bytes, deleting files no remaining key points at.
+        """
+        for key in sorted(self.entries,
+                          key=lambda k: self.entries[k]["last_used"]):
+            if self.total <= self.max_bytes * EVICT_TO:
+                break
+            self._drop(key)
+            self.stats["evictions"] += 1
+
+    def materialize(self, path, destination):
+        """
+        Copies a stored file to destination. The copy is written next to
+        destination and renamed into place, so writing to destination later
+        never changes the stored file.
+
+        Args:
+            path (Path): stored file returned by get or put
+            destination (Path): where the file should appear
+        Returns:
+            destination (Path)
+        """
+        destination = Path(destination)
+        tmp_path = destination.with_name(destination.name + ".part")
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, destination)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return destination
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 hex digest of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_cache(cache_dir, max_bytes=2 * 1024 ** 3):
+    """
+    Returns the FileCache of a directory, opening it on first use so every
+    caller in the process shares one index.
+    """
+    key = os.path.abspath(cache_dir)
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = FileCache(key, max_bytes=max_bytes)
+            atexit.register(_CACHES[key].flush)
+        return _CACHES[key]
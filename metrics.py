@@ -0,0 +1,264 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# seconds, from a cached lookup to a long conversion
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+# set VC_METRICS=0 to turn recording off
+_enabled = os.environ.get("VC_METRICS", "1") != "0"
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """
+    Stops recording. Timers and timed functions then cost one flag check.
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape_label(value):
+    # the exposition format escapes backslashes, quotes and newlines
+    return str(value).replace("\\", "\\\\").replace('"', '\\"') \
+        .replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"'
+                          for name, value in pairs) + "}"
+
+
+class Counter:
+    """
+    Monotonically increasing count, one per combination of labels.
+
+    @arg name = String, metric name, e.g. "fora_requests_total"
+    @arg help = String, description exported with the metric
+    """
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return [{"labels": dict(key), "value": value}
+                    for key, value in self.values.items()]
+
+    def prometheus(self):
+        with self.lock:
+            return [f"{self.name}{_format_labels(key)} {value}"
+                    for key, value in self.values.items()]
+
+
+class Histogram:
+    """
+    Distribution of observed values, e.g. durations in seconds, counted
+    into cumulative buckets per combination of labels.
+
+    @arg name = String, metric name, e.g. "decode_seconds"
+    @arg help = String, description exported with the metric
+    @arg buckets = tuple of floats, upper bounds of the buckets
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def observe(self, value, **labels):
+        if not _enabled:
+            return
+        key = _label_key(labels)
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0, "count": 0, "max": value}
+            entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+            entry["max"] = max(entry["max"], value)
+
+    def time(self, **labels):
+        """
+        Context manager observing the seconds its block takes.
+        """
+        if not _enabled:
+            return _NULL_TIMER
+        return self._time(labels)
+
+    @contextmanager
+    def _time(self, labels):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - begin, **labels)
+
+    def snapshot(self):
+        with self.lock:
+            return [{"labels": dict(key), "count": entry["count"],
+                     "sum": entry["sum"], "max": entry["max"],
+                     "mean": entry["sum"] / entry["count"],
+                     "buckets": dict(zip(
+                         [str(bound) for bound in self.buckets] + ["+Inf"],
+                         entry["counts"]))}
+                    for key, entry in self.values.items()]
+
+    def prometheus(self):
+        lines = []
+        with self.lock:
+            for key, entry in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",),
+                                        entry["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket"
+                                 f"{_format_labels(key, [('le', bound)])} "
+                                 f"{cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} "
+                             f"{entry['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} "
+                             f"{entry['count']}")
+        return lines
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def _get_metric(cls, name, help, **kwargs):
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(name)
+        if metric is None:
+            metric = _REGISTRY[name] = cls(name, help, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} is already a {metric.kind}")
+        return metric
+
+
+def counter(name, help=""):
+    """
+    Returns the registered Counter called name, creating it on first use.
+    """
+    return _get_metric(Counter, name, help)
+
+
+def histogram(name, help="", buckets=DEFAULT_BUCKETS):
+    """
+    Returns the registered Histogram called name, creating it on first use.
+    """
+    return _get_metric(Histogram, name, help, buckets=buckets)
+
+
+def timer(name, help="", **labels):
+    """
+    Context manager recording how long its block takes in the histogram
+    called name, e.g. with metrics.timer("decode_seconds"): ...
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return histogram(name, help).time(**labels)
+
+
+def timed(name, help="", **labels):
+    """
+    Decorator recording how long every call of a function takes in the
+    histogram called name.
+    """
+    def decorator(func):
+        metric = histogram(name, help)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            begin = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - begin, **labels)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """
+    Returns every metric as a JSON serializable dictionary.
+    """
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+    return {metric.name: {"type": metric.kind, "help": metric.help,
+                          "values": metric.snapshot()}
+            for metric in metrics}
+
+
+def prometheus_text():
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+    lines = []
+    for metric in metrics:
+        if metric.help:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.prometheus())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """
+    Forgets every recorded value, keeping the registered metrics.
+    """
+    with _REGISTRY_LOCK:
+        metrics = list(_REGISTRY.values())
+    for metric in metrics:
+        with metric.lock:
+            metric.values.clear()
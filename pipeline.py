@@ -0,0 +1,262 @@
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+import conversation_highlight as ch
+import fetch_conversations as fetch
+import voice_conversion as vc
+from conversation_highlight import ConversationHighlight
+
+# redaction lives with the backend of the redaction UI, whose directory
+# name can't be imported as a package
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "audio-redaction-ui", "backend"))
+import redaction as r  # noqa: E402
+
+_DONE = object()
+
+
+class Stage:
+    """
+    Step of a Pipeline, run by its own worker threads.
+
+    @arg name = String, name printed in the timings
+    @arg func = function taking an item and returning the item for the next
+    stage
+    @arg workers = int, number of items the stage works on at once
+    """
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.times = []
+        self.failures = 0
+        self.blocked = 0.0
+
+    def record(self, seconds, failed=False, blocked=0.0):
+        with self.lock:
+            self.times.append(seconds)
+            self.failures += failed
+            self.blocked += blocked
+
+    def timings(self):
+        """
+        Returns:
+            (Dictionary): items, failures, busy, mean and max seconds, and
+            seconds spent blocked on a full queue to the next stage
+        """
+        with self.lock:
+            times = list(self.times)
+            return {"stage": self.name, "items": len(times),
+                    "failures": self.failures, "busy": sum(times),
+                    "mean": sum(times) / len(times) if times else 0.0,
+                    "max": max(times, default=0.0),
+                    "blocked": self.blocked}
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues. Every stage has
+    its own workers, so while one highlight is being converted the next
+    ones are already being fetched and decoded, and a slow stage holds the
+    ones before it back instead of letting items pile up in memory.
+
+    @arg stages = list of Stages, in the order items go through them
+    @arg queue_size = int, items waiting in front of each stage at most
+    """
+    def __init__(self, stages, queue_size=4):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.failures = []
+        # a stage hands one end marker to every worker of the next stage
+        self._next_workers = {
+            stage.name: (stages[i + 1].workers if i + 1 < len(stages) else 0)
+            for i, stage in enumerate(stages)}
+
+    def _work(self, stage, inbox, outbox, finished, results):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                with stage.lock:
+                    finished[stage.name] += 1
+                    last = finished[stage.name] == stage.workers
+                if last and outbox is not None:
+                    for _ in range(self._next_workers[stage.name]):
+                        outbox.put(_DONE)
+                return
+            begin = time.perf_counter()
+            try:
+                item = stage.func(item)
+            except Exception as e:
+                stage.record(time.perf_counter() - begin, failed=True)
+                self.failures.append((stage.name, item, e))
+                print(f"{stage.name} failed for {item.get('id')}: {e}")
+                continue
+            elapsed = time.perf_counter() - begin
+            blocked = time.perf_counter()
+            if outbox is None:
+                results.append(item)
+            else:
+                outbox.put(item)
+            stage.record(elapsed, blocked=time.perf_counter() - blocked)
+
+    def run(self, items):
+        """
+        Runs every item through all stages.
+
+        Args:
+            items (iterable of Dictionaries): one per highlight, with an "id"
+        Returns:
+            results (list of Dictionaries): items that made it through every
+            stage, in the order they finished
+        """
+        inboxes = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        finished = {stage.name: 0 for stage in self.stages}
+        results = []
+        threads = []
+        for i, stage in enumerate(self.stages):
+            outbox = inboxes[i + 1] if i + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work, daemon=True,
+                    args=(stage, inboxes[i], outbox, finished, results))
+                thread.start()
+                threads.append(thread)
+        for item in items:
+            inboxes[0].put(item)
+        for _ in range(self.stages[0].workers):
+            inboxes[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def print_timings(self, wall_time=None):
+        print(f"{'stage':>12} {'items':>6} {'failed':>6} {'busy s':>8} "
+              f"{'mean s':>8} {'max s':>8} {'blocked s':>10}")
+        for stage in self.stages:
+            t = stage.timings()
+            print(f"{t['stage']:>12} {t['items']:>6} {t['failures']:>6} "
+                  f"{t['busy']:>8.2f} {t['mean']:>8.2f} {t['max']:>8.2f} "
+                  f"{t['blocked']:>10.2f}")
+        if wall_time is not None:
+            print(f"wall time: {wall_time:.2f} s")
+
+
+def fetch_stage(api_key, output_directory, session=None):
+    """
+    Returns a stage function downloading the .json and mp3 of an item's
+    highlight, or using the json_file and audio_path it already has.
+    """
+    def fetch_item(item):
+        if "json_file" not in item:
+            item["json_file"], item["audio_path"] = fetch.fetch_highlight(
+                item["id"], api_key, output_directory, session=session)
+        return item
+    return fetch_item
+
+
+def decode_stage(samp_rate=16000):
+    """
+    Returns a stage function decoding an item's audio into the memory
+    mapped decode cache.
+    """
+    def decode_item(item):
+        item["samples"] = ch.mp3_to_ndarray(str(item["audio_path"]),
+                                            samp_rate)
+        item["samp_rate"] = samp_rate
+        return item
+    return decode_item
+
+
+def transcript_stage(item):
+    """
+    Builds the ConversationHighlight of an item from its .json and decoded
+    audio.
+    """
+    words = ch.load_word_index(str(item["json_file"]))
+    item["highlight"] = ConversationHighlight(
+        share_location=None,
+        share_text=None,
+        transformed=False,
+        auto_gen=False,
+        transcript=words.transcript,
+        audio=item["samples"],
+        conv_rec=None,
+        sharer_iden=None,
+        og_hr=None,
+        primary_speaker_iden=None,
+        add_speaker_iden=None,
+        tags=words.tags,
+        samp_rate=item["samp_rate"],
+        words=words
+    )
+    return item
+
+
+def convert_stage(output_directory, backend=vc.BACKEND):
+    """
+    Returns a stage function converting an item's highlight to a random
+    voice of a backend.
+    """
+    def convert_item(item):
+        item["converted"] = vc.main(str(output_directory), item["highlight"],
+                                    str(item["audio_path"]), item["id"],
+                                    input_json=str(item["json_file"]),
+                                    backend=backend)
+        return item
+    return convert_item
+
+
+def redact_stage(output_directory, redacted_words):
+    """
+    Returns a stage function bleeping every instance of redacted_words in
+    an item's audio.
+    """
+    def redact_item(item):
+        item["redacted"] = r.redact_mp3_by_words(
+            str(item["audio_path"]), str(item["json_file"]),
+            str(output_directory), item["id"], redacted_words)
+        return item
+    return redact_item
+
+
+def build_pipeline(output_directory, api_key=None, redacted_words=(),
+                   convert=True, backend=vc.BACKEND, fetch_workers=4,
+                   decode_workers=2, convert_workers=2, redact_workers=2,
+                   queue_size=4):
+    """
+    Builds the fetch → decode → transcript → convert → redact pipeline.
+
+    Args:
+        output_directory (Path): directory the downloads and outputs go to
+        api_key (String): Fora API Key, only needed for items to download
+        redacted_words (list of Strings): words and phrases to bleep, the
+        redact stage is left out if empty
+        convert (boolean): include the voice conversion stage
+        backend (String): name of a registered conversion backend
+        fetch_workers, decode_workers, convert_workers, redact_workers
+        (int): workers of each stage
+        queue_size (int): items waiting in front of each stage at most
+    Returns:
+        (Pipeline)
+    """
+    Path(output_directory).mkdir(parents=True, exist_ok=True)
+    stages = [
+        Stage("fetch", fetch_stage(api_key, output_directory,
+                                   fetch.make_session(fetch_workers)),
+              fetch_workers),
+        Stage("decode", decode_stage(), decode_workers),
+        Stage("transcript", transcript_stage),
+    ]
+    if convert:
+        stages.append(Stage("convert", convert_stage(output_directory,
+                                                     backend),
+                            convert_workers))
+    if redacted_words:
+        stages.append(Stage("redact", redact_stage(output_directory,
+                                                   list(redacted_words)),
+                            redact_workers))
+    return Pipeline(stages, queue_size=queue_size)
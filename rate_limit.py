@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every caller of one API, so concurrent fetchers
+    and conversion workers draw from the same request budget.
+
+    @arg rate = float, requests per second the bucket refills at
+    @arg burst = int, number of requests that can be sent back to back
+    """
+    def __init__(self, rate=5.0, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "throttles": 0, "retries": 0,
+                      "errors": 0, "wait_time": 0.0}
+
+    def acquire(self):
+        """
+        Blocks until a request may be sent and takes one token.
+
+        Returns:
+            waited (float): seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.stats["requests"] += 1
+                    self.stats["wait_time"] += waited
+                    return waited
+                delay = max(self.blocked_until - now,
+                            (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self, delay):
+        """
+        Stops every caller from sending requests for delay seconds, e.g.
+        after the server answered 429.
+        """
+        with self.lock:
+            self.blocked_until = max(self.blocked_until,
+                                     time.monotonic() + delay)
+            self.tokens = 0.0
+            self.stats["throttles"] += 1
+
+    def record(self, counter, amount=1):
+        """
+        Adds amount to one of the exported counters.
+        """
+        with self.lock:
+            self.stats[counter] = self.stats.get(counter, 0) + amount
+
+    def snapshot(self):
+        """
+        Returns a copy of the counters (requests, throttles, retries, errors,
+        wait_time in seconds).
+        """
+        with self.lock:
+            return dict(self.stats)
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(name, rate=5.0, burst=10):
+    """
+    Returns the shared RateLimiter of an API, creating it on first use.
+
+    Args:
+        name (String): name of the API, e.g. "fora" or "elevenlabs"
+        rate (float): requests per second, only used on creation
+        burst (int): bucket size, only used on creation
+    Returns:
+        (RateLimiter): limiter shared by every caller using this name
+    """
+    with _LIMITERS_LOCK:
+        if name not in _LIMITERS:
+            _LIMITERS[name] = RateLimiter(rate=rate, burst=burst)
+        return _LIMITERS[name]
+
+
+def retry_after(headers):
+    """
+    Reads how long the server asked us to wait from Retry-After or
+    X-RateLimit-Reset headers.
+
+    Args:
+        headers (Mapping): response headers
+    Returns:
+        (float or None): seconds to wait, None if the server didn't say
+    """
+    # clients hand headers over as plain dictionaries with any casing
+    headers = {str(name).lower(): value for name, value in headers.items()}
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() -
+                           time.time())
+            except (TypeError, ValueError):
+                pass
+    reset = headers.get("x-ratelimit-reset")
+    if reset is not None and headers.get("x-ratelimit-remaining") in (None,
+                                                                      "0"):
+        try:
+            reset = float(reset)
+        except ValueError:
+            return None
+        # large values are epoch timestamps, small ones are deltas
+        return max(0.0, reset - time.time()) if reset > 1e9 else reset
+    return None
+
+
+def backoff(attempt, base=0.5, cap=30.0):
+    """
+    Returns a jittered exponential backoff delay in seconds for a retry.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_timeout(error):
+    """
+    Checks if an error is a timeout, including the httpx timeouts raised by
+    the ElevenLabs client, which don't subclass TimeoutError.
+    """
+    if isinstance(error, TimeoutError):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        pass
+    else:
+        if isinstance(error, httpx.TimeoutException):
+            return True
+    # other clients name their timeouts too, e.g. requests' ReadTimeout
+    return any("Timeout" in cls.__name__ for cls in type(error).__mro__)
+
+
+def error_headers(error):
+    """
+    Returns the response headers an API error carries, either on itself
+    like the ElevenLabs ApiError or on its response like httpx errors.
+    """
+    headers = getattr(error, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+    return headers or {}
+
+
+def call_with_retries(func, limiter, max_retries=5):
+    """
+    Calls func under a rate limiter, retrying rate limited (429), server
+    (5xx) and timeout errors until the retry budget runs out, waiting as
+    long as the server's Retry-After asks or with backoff. Errors are
+    recognised by a status_code attribute, as raised by the ElevenLabs
+    client, and timeouts by is_timeout.
+
+    Args:
+        func (function): function taking no arguments
+        limiter (RateLimiter): limiter shared by every caller of the API
+        max_retries (int): number of retries before the error is re-raised
+    Returns:
+        result of func
+    """
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            return func()
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            retryable = status == 429 or (status is not None and
+                                          status >= 500) or \
+                is_timeout(e)
+            if not retryable or attempt >= max_retries:
+                limiter.record("errors")
+                raise
+            delay = retry_after(error_headers(e))
+            if delay is None:
+                delay = backoff(attempt)
+            if status == 429:
+                limiter.throttle(delay)
+            else:
+                time.sleep(delay)
+            limiter.record("retries")
+            attempt += 1
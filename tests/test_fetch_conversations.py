@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import fetch_conversations as fetch  # noqa: E402
+import rate_limit  # noqa: E402
+
+PAGES = 3
+PER_PAGE = 5
+
+
+class FakeFora(BaseHTTPRequestHandler):
+    """
+    Stand-in for the Fora API: a paginated conversation listing, highlight
+    .json with ETags and audio. Every request is logged with its time.
+    """
+    log = []
+    failing = set()
+    download_delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        FakeFora.log.append((time.monotonic(), url.path, self.headers.get(
+            "If-None-Match")))
+        parts = url.path.strip("/").split("/")
+        if parts == ["conversations"]:
+            page = int(parse_qs(url.query)["page"][0])
+            ids = [page * 100 + i for i in range(PER_PAGE)]
+            pagination = {"total": PAGES * PER_PAGE, "last_page": PAGES}
+            return self._send(200, json.dumps([{"id": id} for id in ids])
+                              .encode(),
+                              {"X-Pagination": json.dumps(pagination)})
+        id = parts[1]
+        if id in FakeFora.failing:
+            return self._send(404)
+        time.sleep(FakeFora.download_delay)
+        if len(parts) == 3:
+            return self._send(200, f"audio of {id}".encode())
+        etag = f'"{id}-v1"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers={"ETag": etag})
+        return self._send(200, json.dumps({"id": id, "snippets": []})
+                          .encode(), {"ETag": etag})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # the shared limiter would slow the crawl to the real API's rate
+    monkeypatch.setitem(rate_limit._LIMITERS, "fora",
+                        rate_limit.RateLimiter(rate=1000, burst=1000))
+    FakeFora.log = []
+    FakeFora.failing = set()
+    FakeFora.download_delay = 0.0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeFora)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _requests(path_filter):
+    return [entry for entry in FakeFora.log if path_filter(entry[1])]
+
+
+def _highlight_requests():
+    return _requests(lambda path: path.startswith("/highlights/") and
+                     not path.endswith("/audio"))
+
+
+def test_crawl_downloads_every_page_and_prefetches_the_next(server,
+                                                            tmp_path):
+    FakeFora.download_delay = 0.05
+    paths = fetch.fetch_all_conversations("key", tmp_path, workers=2,
+                                          base_url=server, cache_dir=None)
+    assert len(paths) == PAGES * PER_PAGE
+    for json_path, audio_path in paths:
+        assert json_path.exists() and audio_path.exists()
+    # page 2 is listed while page 1 is still downloading
+    page_2 = _requests(lambda path: path == "/conversations")[1][0]
+    last_page_1 = max(time for time, path, _ in FakeFora.log
+                      if path.startswith("/highlights/1"))
+    assert page_2 < last_page_1
+
+
+def test_interrupted_crawl_resumes_from_saved_state(server, tmp_path):
+    FakeFora.failing = {"203"}
+    with pytest.raises(Exception):
+        fetch.fetch_all_conversations("key", tmp_path, workers=2,
+                                      base_url=server, cache_dir=None)
+    state = json.loads((tmp_path / fetch.STATE_FILE).read_text())
+    assert len(state["completed"]) == PAGES * PER_PAGE - 1
+
+    FakeFora.failing = set()
+    FakeFora.log = []
+    fetch.fetch_all_conversations("key", tmp_path, workers=2,
+                                  base_url=server, cache_dir=None)
+    assert [path for _, path, _ in _highlight_requests()] == \
+        ["/highlights/203"]
+
+
+def test_cached_highlights_are_revalidated_with_etags(server, tmp_path):
+    output_dir, cache_dir = tmp_path / "out", tmp_path / "cache"
+    output_dir.mkdir()
+    fetch.fetch_all_conversations("key", output_dir, workers=2,
+                                  base_url=server, cache_dir=cache_dir)
+    # forget the crawl state, so every highlight is requested again
+    (output_dir / fetch.STATE_FILE).unlink()
+    FakeFora.log = []
+    paths = fetch.fetch_all_conversations("key", output_dir, workers=2,
+                                          base_url=server,
+                                          cache_dir=cache_dir)
+    requests = _highlight_requests()
+    assert len(requests) == PAGES * PER_PAGE
+    assert all(etag is not None for _, _, etag in requests)
+    # 304s keep the cached audio, so none is downloaded again
+    assert not _requests(lambda path: path.endswith("/audio"))
+    assert all(audio_path.read_bytes().startswith(b"audio of")
+               for _, audio_path in paths)
@@ -0,0 +1,54 @@
+import functools
+import os
+import sys
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import conversation_highlight as ch  # noqa: E402
+from conversation_highlight import (  # noqa: E402
+    ConversationHighlight,
+    LazyAudio,
+    WordIndex,
+    load_highlight,
+    save_highlight
+)
+
+SAMP_RATE = 22050
+
+
+def _words():
+    return WordIndex(["hello", "there"], np.array([0.5, 1.0]),
+                     np.array([0.9, 1.4]), np.array([0.9, 0.8]), 0.5,
+                     np.array([0, 0]), [("0", "Speaker")])
+
+
+def test_lazy_audio_rate_round_trips(tmp_path, monkeypatch):
+    monkeypatch.setattr(ch, "mp3_to_ndarray", functools.partial(
+        ch.mp3_to_ndarray, cache_dir=str(tmp_path / "decoded")))
+    samples = np.sin(np.linspace(0, 440 * 2 * np.pi, 2 * SAMP_RATE))
+    audio_path = str(tmp_path / "tone.wav")
+    sf.write(audio_path, samples.astype(np.float32), SAMP_RATE)
+
+    highlight = ConversationHighlight(
+        transcript="hello there", audio=LazyAudio(audio_path, SAMP_RATE),
+        words=_words())
+    assert highlight.samp_rate == SAMP_RATE
+
+    loaded = load_highlight(save_highlight(highlight,
+                                           str(tmp_path / "h.vchl")))
+    assert loaded.samp_rate == SAMP_RATE
+    assert len(loaded.audio) == 2 * SAMP_RATE
+    np.testing.assert_allclose(loaded.audio, highlight.audio)
+    assert len(loaded.audio_slice(0.5, 1.0)) == SAMP_RATE // 2
+    assert loaded.words.words == ["hello", "there"]
+
+
+def test_array_audio_rate_round_trips(tmp_path):
+    samples = np.zeros(SAMP_RATE, dtype=np.float32)
+    highlight = ConversationHighlight(audio=samples, samp_rate=SAMP_RATE)
+    loaded = load_highlight(save_highlight(highlight,
+                                           str(tmp_path / "h.vchl")))
+    assert loaded.samp_rate == SAMP_RATE
+    assert len(loaded.audio_slice(0, 0.5)) == SAMP_RATE // 2
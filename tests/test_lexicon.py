@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "audio-redaction-ui", "backend"))
+from lexicon import RedactionLexicon  # noqa: E402
+
+
+def test_overlapping_phrases_are_all_found():
+    lexicon = RedactionLexicon(["new york", "york city", "new york city",
+                                "city"])
+    words = ["I", "moved", "to", "New", "York", "City,", "then", "York."]
+    assert sorted(lexicon.spans(words)) == [(3, 4), (3, 5), (4, 5), (5, 5)]
+    assert lexicon.positions(words) == [3, 4, 5]
+
+
+def test_failure_links_restart_partial_matches():
+    # "a a b" must still match after the first "a a" turns out not to be
+    # followed by "b"
+    lexicon = RedactionLexicon(["a a b", "a b"])
+    assert sorted(lexicon.spans(["a", "a", "a", "b"])) == [(1, 3), (2, 3)]
+
+
+def test_patterns_match_whole_normalized_words():
+    lexicon = RedactionLexicon(["secret"], [r"\d{3,}"])
+    words = ["Call", "555-1234", "or", "5551234", "12", "Secret!"]
+    assert lexicon.positions(words) == [3, 5]
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+import rate_limit  # noqa: E402
+from rate_limit import (  # noqa: E402
+    RateLimiter,
+    call_with_retries,
+    retry_after
+)
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _failing(*errors):
+    """
+    Returns a function raising errors in turn, then returning "ok".
+    """
+    errors = list(errors)
+
+    def func():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+    return func
+
+
+def test_retry_after_seconds():
+    assert retry_after({"Retry-After": "7"}) == 7.0
+    assert retry_after({"retry-after": "1.5"}) == 1.5
+    assert retry_after({"Retry-After": "-3"}) == 0.0
+    assert retry_after({}) is None
+
+
+def test_retry_after_http_date():
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = retry_after({"Retry-After": format_datetime(later, usegmt=True)})
+    assert 28 <= delay <= 30
+    earlier = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert retry_after({"Retry-After":
+                        format_datetime(earlier, usegmt=True)}) == 0.0
+
+
+def test_retry_after_rate_limit_reset():
+    assert retry_after({"X-RateLimit-Reset": "4",
+                        "X-RateLimit-Remaining": "0"}) == 4.0
+    assert retry_after({"X-RateLimit-Reset": "4",
+                        "X-RateLimit-Remaining": "3"}) is None
+    reset = retry_after({"X-RateLimit-Reset": str(time.time() + 10)})
+    assert 9 <= reset <= 10
+
+
+def test_limiter_allows_burst_then_waits():
+    limiter = RateLimiter(rate=50, burst=3)
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire() > 0
+
+
+def test_throttle_blocks_every_caller():
+    limiter = RateLimiter(rate=1000, burst=10)
+    limiter.throttle(0.05)
+    begin = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - begin >= 0.05
+    assert limiter.snapshot()["throttles"] == 1
+
+
+def test_call_with_retries_honours_retry_after(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limit.time, "sleep", slept.append)
+    limiter = RateLimiter(rate=1000, burst=10)
+    func = _failing(ApiError(503, {"Retry-After": "2"}),
+                    ApiError(500, {"retry-after": "0.5"}))
+    assert call_with_retries(func, limiter) == "ok"
+    assert slept == [2.0, 0.5]
+    assert limiter.snapshot()["retries"] == 2
+
+
+def test_call_with_retries_throttles_on_429():
+    limiter = RateLimiter(rate=1000, burst=10)
+    func = _failing(ApiError(429, {"Retry-After": "0.05"}))
+    begin = time.monotonic()
+    assert call_with_retries(func, limiter) == "ok"
+    assert time.monotonic() - begin >= 0.05
+    assert limiter.snapshot()["throttles"] == 1
+
+
+def test_call_with_retries_retries_timeouts(monkeypatch):
+    monkeypatch.setattr(rate_limit, "backoff", lambda attempt: 0.0)
+    limiter = RateLimiter(rate=1000, burst=10)
+    assert call_with_retries(_failing(TimeoutError()), limiter) == "ok"
+    assert limiter.snapshot()["retries"] == 1
+
+
+def test_call_with_retries_gives_up(monkeypatch):
+    monkeypatch.setattr(rate_limit, "backoff", lambda attempt: 0.0)
+    limiter = RateLimiter(rate=1000, burst=10)
+    with pytest.raises(ApiError):
+        call_with_retries(_failing(ApiError(400)), limiter)
+    with pytest.raises(ApiError):
+        call_with_retries(_failing(*[ApiError(502)] * 3), limiter,
+                          max_retries=2)
+    stats = limiter.snapshot()
+    assert stats["errors"] == 2
+    assert stats["retries"] == 2
@@ -0,0 +1,135 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "audio-redaction-ui", "backend"))
+import redaction as r  # noqa: E402
+
+RATE = 16000
+
+
+def _tone(seconds, silences=()):
+    """
+    Returns (samples, 1) of a 200 Hz tone with silent (start, end)
+    milliseconds.
+    """
+    t = np.arange(int(RATE * seconds)) / RATE
+    samples = 0.5 * np.sin(2 * np.pi * 200 * t)
+    for start, end in silences:
+        samples[int(start * RATE / 1000):int(end * RATE / 1000)] = 0
+    return samples[:, np.newaxis]
+
+
+def test_align_never_shrinks_into_the_word():
+    # quiet dips just inside the word must not pull the boundaries in
+    samples = _tone(3, [(1040, 1070), (1330, 1360)])
+    [(start, end)] = r.align_intervals(samples, RATE, [(1000, 1400)])
+    assert start <= 1000
+    assert end >= 1400
+
+
+def test_align_moves_boundaries_into_nearby_gaps():
+    samples = _tone(3, [(930, 960), (1440, 1470)])
+    [(start, end)] = r.align_intervals(samples, RATE, [(1000, 1400)])
+    assert 930 <= start <= 960
+    assert 1440 <= end <= 1470
+
+
+def test_failed_preview_update_leaves_preview_unchanged(monkeypatch):
+    from pydub.generators import Sine
+    audio = Sine(300).to_audio_segment(3000).set_frame_rate(RATE)
+    preview = r.RedactionPreview(audio)
+    preview.update([(100, 200)])
+    samples, intervals = preview.samples.copy(), preview.intervals
+
+    def fail(*args):
+        raise TypeError("render failed")
+    monkeypatch.setattr(r, "_render_interval", fail)
+    try:
+        preview.update([(500, 1000)])
+    except TypeError:
+        pass
+    assert (preview.samples == samples).all()
+    assert preview.intervals == intervals
+
+    monkeypatch.undo()
+    assert preview.update([(500, 1000)]) == [(100, 200), (500, 1000)]
+
+
+def test_previews_share_the_original_samples():
+    from pydub.generators import Sine
+    audio = Sine(300).to_audio_segment(1000)
+    first, second = r.RedactionPreview(audio), r.RedactionPreview(audio)
+    assert np.shares_memory(first.original, second.original)
+
+
+def test_merge_intervals_joins_overlapping_and_adjacent():
+    intervals = [(500, 600), (0, 100), (50, 200), (200, 300), (700, 700)]
+    assert r.merge_intervals(intervals) == [(0, 300), (500, 600)]
+
+
+def _sine(milliseconds):
+    from pydub.generators import Sine
+    return Sine(300).to_audio_segment(milliseconds).set_frame_rate(RATE)
+
+
+def _samples(audio):
+    return np.array(audio.get_array_of_samples())
+
+
+def test_redact_audio_segment_silences_overlapping_and_adjacent():
+    audio = _sine(1000)
+    redacted = r.redact_audio_segment(
+        audio, [(200, 400), (100, 300), (400, 500)], mode="silence")
+    samples, original = _samples(redacted), _samples(audio)
+    first, last = RATE * 100 // 1000, RATE * 500 // 1000
+    assert len(redacted) == len(audio)
+    assert (samples[first:last] == 0).all()
+    assert (samples[:first] == original[:first]).all()
+    assert (samples[last:] == original[last:]).all()
+
+
+def test_redact_audio_segment_bleeps_overlaps_once():
+    audio = _sine(1000)
+    overlapping = r.redact_audio_segment(audio, [(100, 300), (200, 400),
+                                                 (400, 450)])
+    merged = r.redact_audio_segment(audio, [(100, 450)])
+    assert (_samples(overlapping) == _samples(merged)).all()
+
+
+def _snippets():
+    def words(*timed):
+        return [{"word": word, "start": start, "end": end}
+                for word, start, end in timed]
+    return [{"words": words(("my", 10.0, 10.2), ("name", 10.2, 10.5),
+                            ("is", 10.5, 10.6))},
+            {"words": words(("Jane", 11.0, 11.4), ("Doe", 11.4, 11.8),
+                            ("hi", 12.0, 12.2))}]
+
+
+def test_redact_transcript_range_spanning_snippets():
+    snippets = _snippets()
+    inserted, texts = r.redact_transcript(snippets, [(10.45, 11.9)])
+    assert inserted == [(10.45, 11.9)]
+    assert texts == ["my name [redacted]", "hi"]
+    assert snippets[0]["reco_words"][-1] == ["[redacted]", 10.45, 11.9, 1]
+    assert [w["word"] for w in snippets[1]["reco_words"]] == ["hi"]
+
+
+def test_redact_transcript_merges_overlapping_ranges():
+    snippets = _snippets()
+    inserted, texts = r.redact_transcript(snippets, [(11.3, 12.3),
+                                                     (10.15, 10.55),
+                                                     (10.5, 11.35)])
+    assert inserted == [(10.15, 12.3)]
+    assert texts == ["my [redacted]", ""]
+
+
+def test_transcript_ranges_invert_word_redaction_points():
+    from conversation_highlight import WordIndex
+    index = WordIndex(["my", "name", "is"], [10.0, 10.2, 10.5],
+                      [10.2, 10.5, 10.6], [1.0, 1.0, 1.0], 10.0)
+    points = r.word_redaction_points(index, [1, 2])
+    ranges = r.transcript_redaction_ranges(index, points)
+    assert np.allclose(ranges, [(10.2, 10.5), (10.5, 10.6)])
@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import voice_conversion as vc  # noqa: E402
+from conversation_highlight import load_word_index  # noqa: E402
+
+HIGHLIGHT_JSON = os.path.join(ROOT, "testing", "conversation-5300643.json")
+
+
+def _words(start, count, length=0.4, pause=0.1):
+    return [{"word": f"w{start + i}", "start": start + i * (length + pause),
+             "end": start + i * (length + pause) + length, "confidence": 1.0}
+            for i in range(count)]
+
+
+@pytest.mark.parametrize("max_seconds", [2, 5, 10])
+def test_chunks_are_full_and_cut_between_words(max_seconds):
+    chunks = vc.plan_chunks(HIGHLIGHT_JSON, max_seconds)
+    starts, ends = load_word_index(HIGHLIGHT_JSON).audio_times()
+    for start, end in chunks[:-1]:
+        assert end - start <= max_seconds
+        # this highlight pauses often enough to cut in every chunk's end
+        assert end - start >= (1 - vc.LATE_CUT_FRACTION) * max_seconds
+        assert not ((starts < end) & (end < ends)).any()
+
+
+def test_chunks_follow_time_order_across_snippets(tmp_path):
+    # the second snippet is listed first but spoken later
+    data = {"audio_start_offset": 0.0,
+            "snippets": [{"words": _words(10.0, 20)},
+                         {"words": _words(0.0, 20)}]}
+    path = tmp_path / "conversation-1.json"
+    path.write_text(json.dumps(data))
+    chunks = vc.plan_chunks(str(path), 5)
+    assert chunks[0][0] == 0.0
+    assert all(end > start for start, end in chunks[:-1])
+    assert [end for _, end in chunks[:-1]] == \
+        sorted(end for _, end in chunks[:-1])
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+
+
+class CatalogVoice:
+    """
+    Voice read from a voices.json snapshot, with the attributes of the
+    ElevenLabs Voice objects that the pipeline uses.
+
+    @arg voice_id = String, ElevenLabs voice ID
+    @arg name = String, name of the voice
+    @arg labels = Dictionary, e.g. gender, accent and age of the voice
+    """
+    def __init__(self, voice_id, name, labels=None):
+        self.voice_id = voice_id
+        self.name = name
+        self.labels = labels or {}
+
+    def __repr__(self):
+        return f"CatalogVoice({self.name!r}, {self.voice_id!r})"
+
+
+class VoiceCatalog:
+    """
+    Lazily loaded, TTL-cached list of voices. Nothing is fetched until the
+    voices are first needed; a voices.json snapshot can answer that first
+    request, and once the voices are older than the TTL they are refreshed
+    in a background thread while the current list keeps being served. A
+    failed refresh is only retried after retry_delay, so an offline catalog
+    doesn't start a thread on every access.
+
+    @arg fetch = function returning the current list of voices
+    @arg seed_path = String, voices.json snapshot to start from, optional
+    @arg ttl = float, seconds before the voices are refreshed
+    @arg retry_delay = float, seconds to wait after a failed refresh
+    """
+    def __init__(self, fetch, seed_path=None, ttl=3600, retry_delay=300):
+        self.fetch = fetch
+        self.seed_path = seed_path
+        self.ttl = ttl
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+        self.all_voices = None
+        self.loaded_at = 0.0
+        self.failed_at = None
+        self.index = {}
+
+    def _set_voices(self, voices, loaded_at):
+        index = {}
+        for voice in voices:
+            for label, value in (getattr(voice, "labels", None) or {}).items():
+                index.setdefault((label, value), []).append(voice)
+        with self.lock:
+            self.all_voices = voices
+            self.index = index
+            self.loaded_at = loaded_at
+
+    def _load_seed(self):
+        with open(self.seed_path, "r") as file:
+            data = json.load(file)
+        voices = [CatalogVoice(voice["voice_id"], voice["name"],
+                               voice.get("labels"))
+                  for voice in data["voices"]]
+        # the snapshot counts as fresh when it is loaded, its age on disk
+        # would make every first access refresh
+        self._set_voices(voices, time.time())
+
+    def refresh(self):
+        """
+        Fetches the voices now, replacing the cached list.
+        """
+        self._set_voices(list(self.fetch()), time.time())
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            with self.lock:
+                self.failed_at = time.time()
+            print(f"Could not refresh voices: {e}")
+
+    def refresh_in_background(self):
+        """
+        Starts a refresh in a daemon thread unless one is already running or
+        the last one failed less than retry_delay ago.
+        """
+        with self.lock:
+            if self.refresh_thread is not None and \
+                    self.refresh_thread.is_alive():
+                return
+            if self.failed_at is not None and \
+                    time.time() - self.failed_at < self.retry_delay:
+                return
+            self.refresh_thread = threading.Thread(
+                target=self._refresh_quietly, daemon=True)
+            self.refresh_thread.start()
+
+    def voices(self):
+        """
+        Returns the list of voices, loading it on first use.
+
+        Returns:
+            voices (list): Voice objects
+        """
+        if self.all_voices is None:
+            if self.seed_path is not None and os.path.exists(self.seed_path):
+                self._load_seed()
+            else:
+                self.refresh()
+        if time.time() - self.loaded_at > self.ttl:
+            self.refresh_in_background()
+        return self.all_voices
+
+    def filter(self, gender=None, accent=None, age=None):
+        """
+        Returns the voices matching every given label, using the label
+        index instead of scanning every voice.
+
+        Args:
+            gender (String): one of GENDERS, any if None
+            accent (String): one of ACCENTS, any if None
+            age (String): one of AGES, any if None
+        Returns:
+            voices (list): matching Voice objects, in catalog order
+        """
+        self.voices()
+        with self.lock:
+            voices, index = self.all_voices, self.index
+        wanted = [(label, value) for label, value in
+                  (("gender", gender), ("accent", accent), ("age", age))
+                  if value is not None]
+        if not wanted:
+            return list(voices)
+        matches = None
+        for key in wanted:
+            ids = {id(voice) for voice in index.get(key, [])}
+            matches = ids if matches is None else matches & ids
+        return [voice for voice in voices if id(voice) in matches]
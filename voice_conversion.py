@@ -1,12 +1,22 @@
-from elevenlabs import ElevenLabs
-import apikey
+import io
+import os
 import random
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from pydub import AudioSegment
+from pydub.utils import get_encoder_name
+import metrics
+from conversion_backends import get_backend
+from file_cache import file_digest, get_cache
+from rate_limit import call_with_retries, get_limiter
+from voice_catalog import VoiceCatalog
 from conversation_highlight import (
     ConversationHighlight,
-    mp3_to_ndarray
-)
-client = ElevenLabs(
-    api_key=apikey.API_KEY,
+    LazyAudio,
+    load_word_index
 )
 OUTPUT_FORMATS = ['mp3_22050_32', 'mp3_44100_32', 'mp3_44100_64', 
                   'mp3_44100_96', 'mp3_44100_128', 'mp3_44100_192',
@@ -17,6 +27,18 @@ MODELS = ['eleven_multilingual_v2', 'eleven_flash_v2_5', 'eleven_flash_v2',
 GENDERS = ['female', 'male']
 ACCENTS = ['American', 'Australian', 'British', 'Transatlantic', 'Swedish']
 AGES = ['middle-aged', 'young', 'old']
+ELEVENLABS_RATE = 2.0
+ELEVENLABS_BURST = 4
+MODEL_ID = 'eleven_multilingual_sts_v2'
+OUTPUT_FORMAT = 'mp3_44100_128'
+BACKEND = 'elevenlabs'
+CONVERSION_CACHE_DIR = Path.home() / ".cache" / "vc" / "conversions"
+VOICES_JSON = Path(__file__).parent / "voices.json"
+VOICE_CATALOG_TTL = 24 * 60 * 60
+CHUNK_SECONDS = 30.0
+CROSSFADE_MS = 50
+# plan_chunks cuts in the last 40% of a chunk when there is a pause there
+LATE_CUT_FRACTION = 0.4
 
 
 def gen_all_voices():
@@ -26,77 +48,569 @@ def gen_all_voices():
     Returns:
         voices (list): List of all Voice objects from ElevenLabs
     """
-    voices = []
-    for voice in client.voices.get_all():
-        for v in voice[1]:
-            voices.append(v)
-    return voices
+    return get_backend("elevenlabs").voices()
+
+
+VOICE_CATALOG = VoiceCatalog(gen_all_voices, seed_path=VOICES_JSON,
+                             ttl=VOICE_CATALOG_TTL)
+_VOICE_CATALOGS = {"elevenlabs": VOICE_CATALOG}
+
+
+def get_voice_catalog(backend=BACKEND):
+    """
+    Returns the VoiceCatalog of a conversion backend. The ElevenLabs
+    catalog starts from voices.json, other backends list their own voices.
+
+    Args:
+        backend (String): name of a registered conversion backend
+
+    Returns:
+        (VoiceCatalog): voices of the backend
+    """
+    if backend not in _VOICE_CATALOGS:
+        _VOICE_CATALOGS[backend] = VoiceCatalog(get_backend(backend).voices,
+                                                ttl=float("inf"))
+    return _VOICE_CATALOGS[backend]
+
+
+def get_all_voices(backend=BACKEND):
+    """
+    Returns all voices, loading them from voices.json on first use and
+    refreshing them from ElevenLabs in the background once they are older
+    than VOICE_CATALOG_TTL
 
+    Args:
+        backend (String): name of a registered conversion backend
+
+    Returns:
+        voices (list): List of all Voice objects
+    """
+    return get_voice_catalog(backend).voices()
+
+
+def _call_backend(backend, func):
+    """
+    Calls func under the backend's shared rate limiter with retries, or
+    directly for backends that don't need one
+    """
+    conversions = metrics.counter("conversions_total",
+                                  "Voice conversions by backend and outcome")
+    try:
+        with metrics.timer("conversion_seconds",
+                           "Time of voice conversions, retries included",
+                           backend=backend.name):
+            if backend.limiter_name is None:
+                result = func()
+            else:
+                limiter = get_limiter(backend.limiter_name,
+                                      rate=ELEVENLABS_RATE,
+                                      burst=ELEVENLABS_BURST)
+                result = call_with_retries(func, limiter)
+    except Exception:
+        conversions.inc(backend=backend.name, outcome="failed")
+        raise
+    conversions.inc(backend=backend.name, outcome="done")
+    return result
 
-ALL_VOICES = gen_all_voices()
 
+def __getattr__(name):
+    # ALL_VOICES used to be fetched at import time, keep it readable
+    if name == "ALL_VOICES":
+        return get_all_voices()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def write_all_output_voices(output_dir, input_audio):
+
+def write_all_output_voices(output_dir, input_audio,
+                            cache_dir=CONVERSION_CACHE_DIR, workers=4,
+                            timeout=None, voices=None, backend=BACKEND):
     """
-    Converts a given audio with all the possible voices from ElevenLabs
+    Converts a given audio with all the possible voices of a backend,
+    running up to workers conversions at once under the backend's shared
+    rate limiter
 
     Args:
         output_dir (String): directory to write the audio files under
         input_audio (String): path of input audio to be converted
+        cache_dir (Path): directory of the conversion cache, None to disable
+        workers (int): number of conversions running at the same time
+        timeout (float): seconds each conversion request may take
+        voices (list): Voice objects to convert to, all voices if None
+        backend (String): name of a registered conversion backend
+
+    Returns:
+        results (Dictionary): key: voice ID, value: path of the converted
+        mp3 file or the exception its conversion raised, in voice order
     """
-    for voice in ALL_VOICES:
-        write_audio_file(output_dir, input_audio, voice)
+    voices = get_all_voices(backend) if voices is None else voices
+    # hash the input once instead of once per voice
+    input_digest = file_digest(input_audio) if cache_dir is not None else None
+    names = [voice.name for voice in voices]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convert_audio_file, output_dir, input_audio,
+                               voice, cache_dir=cache_dir, timeout=timeout,
+                               backend=backend, input_digest=input_digest,
+                               # voices sharing a name get their own files
+                               id=voice.voice_id
+                               if names.count(voice.name) > 1 else "")
+                   for voice in voices]
+        results = {}
+        for voice, future in zip(voices, futures):
+            try:
+                results[voice.voice_id] = future.result()
+            except Exception as e:
+                results[voice.voice_id] = e
+    return results
 
 
-def write_audio_file(output_dir, input_audio, voice, id=""):
+def conversion_key(input_audio, voice_id, model_id, output_format,
+                   backend=BACKEND, input_digest=None):
     """
-    Writes an mp3 file tha is converted using the given voice from ElevenLabs,
-    model and output_format can be changed based o ElevenLabs models
+    Returns the conversion cache key of an input audio file, identifying it
+    by the digest of its contents rather than its path
+
+    Args:
+        input_audio (String): path of input audio to be converted
+        voice_id (String): ID of the voice
+        model_id (String): ID of the model
+        output_format (String): one of OUTPUT_FORMATS
+        backend (String): name of the conversion backend
+        input_digest (String): file_digest of input_audio, if already known
+
+    Returns:
+        (String): cache key
+    """
+    if input_digest is None:
+        input_digest = file_digest(input_audio)
+    return f"{backend}:{input_digest}:{voice_id}:{model_id}:{output_format}"
+
+
+def conversion_cache_stats(cache_dir=CONVERSION_CACHE_DIR):
+    """
+    Returns the hits, misses and evictions of the conversion cache since
+    the process started
+    """
+    return dict(get_cache(cache_dir).stats)
+
+
+def convert_audio_file(output_dir, input_audio, voice, id="",
+                       model_id=MODEL_ID, output_format=OUTPUT_FORMAT,
+                       cache_dir=CONVERSION_CACHE_DIR, timeout=None,
+                       backend=BACKEND, input_digest=None):
+    """
+    Writes an mp3 file that is converted using the given voice of a
+    conversion backend, raising instead of printing if the conversion fails.
+    Conversions of identical audio with the same voice, model and
+    output_format are served from the conversion cache
 
     Args:
         output_dir (String): directory to write the audio files under
         input_audio (String): path of input audio to be converted
         voice (Voice): Voice object from ElevenLabs API
         id (String): ID of Fora highlight
+        model_id (String): one of MODELS
+        output_format (String): one of OUTPUT_FORMATS
+        cache_dir (Path): directory of the conversion cache, None to disable
+        timeout (float): seconds the conversion request may take
+        backend (String): name of a registered conversion backend
+        input_digest (String): file_digest of input_audio, if already known
 
     Returns:
         output_audio (String): path of newly written mp3 file
     """
-    try:
+    engine = get_backend(backend)
+    output_audio = f"{output_dir}/{voice.name}_{id}_output_audio.mp3"
+    cache = get_cache(cache_dir) if cache_dir is not None else None
+    request_options = None
+    if timeout is not None:
+        request_options = {"timeout_in_seconds": timeout}
+
+    def convert():
         with open(input_audio, "rb") as audio_file:
-            converted_audio = client.speech_to_speech.convert(
-                voice_id=voice.voice_id,
-                audio=audio_file,
-                output_format="mp3_44100_128",
-                model_id="eleven_multilingual_sts_v2",
-            )
-            output_audio = f"{output_dir}/{voice.name}_{id}_output_audio.mp3"
+            converted_audio = engine.convert(audio_file, voice, model_id,
+                                             output_format,
+                                             request_options=request_options)
+            if cache is not None:
+                return cache.put(key, converted_audio)
             with open(output_audio, "wb") as output_file:
                 for chunk in converted_audio:
                     output_file.write(chunk)
-            print(f"Converted audio saved to {output_audio}")
+
+    if cache is not None:
+        key = conversion_key(input_audio, voice.voice_id, model_id,
+                             output_format, backend=backend,
+                             input_digest=input_digest)
+        cached = cache.get(key)
+        metrics.counter("conversion_cache_total",
+                        "Conversion cache lookups by result").inc(
+            result="miss" if cached is None else "hit")
+        if cached is not None:
+            cache.materialize(cached[0], output_audio)
+            print(f"Converted audio loaded from cache to {output_audio}")
             return output_audio
+        cache.materialize(_call_backend(engine, convert), output_audio)
+    else:
+        _call_backend(engine, convert)
+    print(f"Converted audio saved to {output_audio}")
+    return output_audio
+
+
+def write_audio_file(output_dir, input_audio, voice, id="",
+                     model_id=MODEL_ID, output_format=OUTPUT_FORMAT,
+                     cache_dir=CONVERSION_CACHE_DIR, backend=BACKEND):
+    """
+    Writes an mp3 file tha is converted using the given voice from ElevenLabs,
+    model and output_format can be changed based o ElevenLabs models
+
+    Args:
+        output_dir (String): directory to write the audio files under
+        input_audio (String): path of input audio to be converted
+        voice (Voice): Voice object from ElevenLabs API
+        id (String): ID of Fora highlight
+        model_id (String): one of MODELS
+        output_format (String): one of OUTPUT_FORMATS
+        cache_dir (Path): directory of the conversion cache, None to disable
+        backend (String): name of a registered conversion backend
+
+    Returns:
+        output_audio (String): path of newly written mp3 file, None if the
+        conversion failed
+    """
+    try:
+        return convert_audio_file(output_dir, input_audio, voice, id=id,
+                                  model_id=model_id,
+                                  output_format=output_format,
+                                  cache_dir=cache_dir, backend=backend)
     except Exception as e:
         print(f"An error occurred: {e}")
 
 
-def write_output_voice(output_dir, input_audio, id=""):
+def plan_chunks(input_json, max_chunk_seconds=CHUNK_SECONDS):
+    """
+    Splits a highlight into chunks of at most max_chunk_seconds, cutting in
+    the widest pause between two words in the last LATE_CUT_FRACTION of
+    each chunk so no word is split and chunks stay close to the maximum.
+    Earlier pauses are only used if the end of a chunk has none, and words
+    are only cut through where they overlap without any pause
+
+    Args:
+        input_json (String): path to .json file of the highlight
+        max_chunk_seconds (float): longest chunk, in seconds
+
+    Returns:
+        chunks (list of tuples): (start, end) of each chunk in seconds from
+        the start of the audio, end is None for the last chunk
+    Raises:
+        ValueError: if a cut in a pause would fall inside a word
+    """
+    index = load_word_index(input_json)
+    starts, ends = index.audio_times()
+    # words of several snippets aren't necessarily in time order
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    words = [index.words[i] for i in order]
+    chunks = []
+    hard_cuts = []
+    chunk_start = 0.0
+    first_word = 0
+    while first_word < len(words):
+        # words [first_word, last_word) end within the current chunk
+        last_word = first_word
+        while last_word < len(words) and \
+                ends[last_word] - chunk_start <= max_chunk_seconds:
+            last_word += 1
+        if last_word >= len(words):
+            break
+        # boundary i lies after word first_word + i, a single word longer
+        # than the chunk is cut right after it
+        stop = max(last_word, first_word + 1)
+        # words may overlap, so a pause starts when every earlier word ended
+        spoken_until = np.maximum.accumulate(ends[first_word:stop])
+        next_starts = starts[first_word + 1:stop + 1]
+        gaps = next_starts - spoken_until
+        cuts = np.minimum((spoken_until + next_starts) / 2,
+                          np.maximum(spoken_until,
+                                     chunk_start + max_chunk_seconds))
+        late = cuts >= chunk_start + \
+            (1 - LATE_CUT_FRACTION) * max_chunk_seconds
+        candidates = np.flatnonzero((gaps >= 0) & late)
+        if len(candidates) == 0:
+            candidates = np.flatnonzero(gaps >= 0)
+        if len(candidates):
+            boundary = int(candidates[gaps[candidates].argmax()])
+        else:
+            # overlapping speech without any pause, cut through it
+            boundary = len(gaps) - 1
+            hard_cuts.append(float(cuts[boundary]))
+        cut = float(cuts[boundary])
+        chunks.append((chunk_start, cut))
+        chunk_start = cut
+        first_word += boundary + 1
+    chunks.append((chunk_start, None))
+    check_chunk_cuts([chunk for chunk in chunks if chunk[1] not in hard_cuts],
+                     starts, ends, words)
+    return chunks
+
+
+def check_chunk_cuts(chunks, starts, ends, words):
+    """
+    Checks that every cut between two chunks falls between words
+
+    Args:
+        chunks (list of tuples): (start, end) of each chunk, as returned by
+        plan_chunks
+        starts (NumPy array): start of each word in seconds of audio
+        ends (NumPy array): end of each word in seconds of audio
+        words (list of Strings): the words, for the error message
+    Raises:
+        ValueError: naming the first word a cut falls inside of
+    """
+    for _, cut in chunks[:-1]:
+        inside = np.flatnonzero((starts < cut) & (cut < ends))
+        if len(inside):
+            word = int(inside[0])
+            raise ValueError(f"chunk cut at {cut:.3f} s falls inside "
+                             f"{words[word]!r} ({starts[word]:.3f} - "
+                             f"{ends[word]:.3f} s)")
+
+
+def convert_segment(segment, voice, model_id=MODEL_ID,
+                    output_format=OUTPUT_FORMAT, timeout=None,
+                    backend=BACKEND):
+    """
+    Converts an in-memory AudioSegment using the given voice of a
+    conversion backend, under the backend's shared rate limiter
+
+    Args:
+        segment (AudioSegment): audio to be converted
+        voice (Voice): Voice object from ElevenLabs API
+        model_id (String): one of MODELS
+        output_format (String): one of the mp3 OUTPUT_FORMATS
+        timeout (float): seconds the conversion request may take
+        backend (String): name of a registered conversion backend
+
+    Returns:
+        (AudioSegment): converted audio
+    """
+    engine = get_backend(backend)
+    request_options = None
+    if timeout is not None:
+        request_options = {"timeout_in_seconds": timeout}
+    input_buffer = io.BytesIO()
+    segment.export(input_buffer, format="mp3")
+
+    def convert():
+        input_buffer.seek(0)
+        converted_audio = engine.convert(input_buffer, voice, model_id,
+                                         output_format,
+                                         request_options=request_options)
+        return b"".join(converted_audio)
+
+    output = _call_backend(engine, convert)
+    return AudioSegment.from_file(io.BytesIO(output), format="mp3")
+
+
+def stream_converted_audio(input_audio, input_json, voice,
+                           max_chunk_seconds=CHUNK_SECONDS, workers=4,
+                           crossfade_ms=CROSSFADE_MS, model_id=MODEL_ID,
+                           output_format=OUTPUT_FORMAT, timeout=None,
+                           backend=BACKEND):
+    """
+    Converts a long recording in chunks split at word boundaries. Up to
+    workers chunks are decoded and converted at once, and converted audio
+    is yielded in order as soon as it is ready, crossfaded into the next
+    chunk, so only a few chunks are ever held in memory
+
+    Args:
+        input_audio (String): path of input audio to be converted
+        input_json (String): path to .json file of the highlight
+        voice (Voice): Voice object from ElevenLabs API
+        max_chunk_seconds (float): longest chunk, in seconds
+        workers (int): number of chunks converted at the same time
+        crossfade_ms (int): overlap between consecutive chunks, in ms
+        model_id (String): one of MODELS
+        output_format (String): one of the mp3 OUTPUT_FORMATS
+        timeout (float): seconds each conversion request may take
+        backend (String): name of a registered conversion backend
+
+    Yields:
+        (AudioSegment): consecutive pieces of the converted audio
+    """
+    def convert_chunk(start, end):
+        duration = None
+        if end is not None:
+            duration = end - start + crossfade_ms / 1000
+        segment = AudioSegment.from_file(input_audio, format="mp3",
+                                         start_second=start,
+                                         duration=duration)
+        return convert_segment(segment, voice, model_id=model_id,
+                               output_format=output_format, timeout=timeout,
+                               backend=backend)
+
+    chunks = iter(plan_chunks(input_json, max_chunk_seconds))
+    pending = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(convert_chunk, *chunk))
+            if len(in_flight) == workers:
+                break
+        while in_flight:
+            converted = in_flight.popleft().result()
+            for chunk in chunks:
+                in_flight.append(pool.submit(convert_chunk, *chunk))
+                break
+            if pending is None:
+                pending = converted
+                continue
+            fade = min(crossfade_ms, len(pending), len(converted))
+            joined = pending.append(converted, crossfade=fade)
+            yield joined[:len(pending) - fade]
+            pending = joined[len(pending) - fade:]
+    if pending is not None:
+        yield pending
+
+
+def write_streamed_audio_file(output_dir, input_audio, input_json, voice,
+                              id="", workers=4,
+                              cache_dir=CONVERSION_CACHE_DIR,
+                              max_chunk_seconds=CHUNK_SECONDS,
+                              crossfade_ms=CROSSFADE_MS, model_id=MODEL_ID,
+                              output_format=OUTPUT_FORMAT, backend=BACKEND,
+                              **kwargs):
+    """
+    Writes an mp3 file converted chunk by chunk with
+    stream_converted_audio, feeding each piece to one ffmpeg encoder as it
+    arrives instead of waiting for the whole conversion. The encoder writes
+    to a temporary file that only replaces output_audio once it succeeded,
+    and finished files go through the conversion cache like
+    convert_audio_file
+
+    Args:
+        output_dir (String): directory to write the audio files under
+        input_audio (String): path of input audio to be converted
+        input_json (String): path to .json file of the highlight
+        voice (Voice): Voice object from ElevenLabs API
+        id (String): ID of Fora highlight
+        workers (int): number of chunks converted at the same time
+        cache_dir (Path): directory of the conversion cache, None to disable
+        max_chunk_seconds (float): longest chunk, in seconds
+        crossfade_ms (int): overlap between consecutive chunks, in ms
+        model_id (String): one of MODELS
+        output_format (String): one of the mp3 OUTPUT_FORMATS
+        backend (String): name of a registered conversion backend
+        **kwargs: passed on to stream_converted_audio
+
+    Returns:
+        output_audio (String): path of newly written mp3 file
+    Raises:
+        RuntimeError: if the encoder failed
+    """
+    output_audio = f"{output_dir}/{voice.name}_{id}_output_audio.mp3"
+    cache = get_cache(cache_dir) if cache_dir is not None else None
+    if cache is not None:
+        # chunked conversions differ from whole ones, so they get own keys
+        key = conversion_key(input_audio, voice.voice_id, model_id,
+                             output_format, backend=backend) + \
+            f":chunks:{max_chunk_seconds}:{crossfade_ms}"
+        cached = cache.get(key)
+        metrics.counter("conversion_cache_total",
+                        "Conversion cache lookups by result").inc(
+            result="miss" if cached is None else "hit")
+        if cached is not None:
+            cache.materialize(cached[0], output_audio)
+            print(f"Converted audio loaded from cache to {output_audio}")
+            return output_audio
+
+    partial_audio = output_audio + ".part"
+    encoder = None
+    try:
+        try:
+            for piece in stream_converted_audio(
+                    input_audio, input_json, voice, workers=workers,
+                    max_chunk_seconds=max_chunk_seconds,
+                    crossfade_ms=crossfade_ms, model_id=model_id,
+                    output_format=output_format, backend=backend, **kwargs):
+                if encoder is None:
+                    params = piece
+                    encoder = subprocess.Popen(
+                        [get_encoder_name(), "-y", "-loglevel", "error",
+                         "-f", f"s{8 * params.sample_width}le",
+                         "-ar", str(params.frame_rate),
+                         "-ac", str(params.channels),
+                         "-i", "pipe:0", "-f", "mp3", partial_audio],
+                        stdin=subprocess.PIPE)
+                piece = piece.set_frame_rate(params.frame_rate) \
+                    .set_channels(params.channels) \
+                    .set_sample_width(params.sample_width)
+                encoder.stdin.write(piece.raw_data)
+        except BrokenPipeError:
+            # the encoder exited early, its return code says why
+            pass
+        finally:
+            if encoder is not None:
+                try:
+                    encoder.stdin.close()
+                except BrokenPipeError:
+                    pass
+                encoder.wait()
+        if encoder is None:
+            raise RuntimeError(f"no audio was converted for {input_audio}")
+        if encoder.returncode != 0:
+            raise RuntimeError(f"encoding {output_audio} failed with exit "
+                               f"code {encoder.returncode}")
+        if cache is not None:
+            with open(partial_audio, "rb") as file:
+                stored = cache.put(key, iter(lambda: file.read(1024 * 1024),
+                                             b""))
+            cache.materialize(stored, output_audio)
+        else:
+            os.replace(partial_audio, output_audio)
+    finally:
+        if os.path.exists(partial_audio):
+            os.remove(partial_audio)
+    print(f"Converted audio saved to {output_audio}")
+    return output_audio
+
+
+def write_output_voice(output_dir, input_audio, id="",
+                       cache_dir=CONVERSION_CACHE_DIR, gender=None,
+                       accent=None, age=None, input_json=None,
+                       backend=BACKEND):
     """
-    Randomly selects one voice from ElevenLabs to convert the input audio to.
+    Randomly selects one voice of a backend to convert the input audio to.
 
     Args:
         output_dir (String): directory to write the audio files under
         input_audio (String): path of input audio to be converted
+        cache_dir (Path): directory of the conversion cache, None to disable
+        gender (String): only pick voices of one of GENDERS, any if None
+        accent (String): only pick voices of one of ACCENTS, any if None
+        age (String): only pick voices of one of AGES, any if None
+        input_json (String): path to .json file of the highlight, if given
+        the audio is converted in chunks with write_streamed_audio_file
+        backend (String): name of a registered conversion backend
 
     Returns:
         (String): path to converted audio file
+    Raises:
+        ValueError: if no voice matches gender, accent and age
     """
-    random_voices = random.sample(ALL_VOICES, 1)
-    for voice in random_voices:
-        return write_audio_file(output_dir, input_audio, voice, id=id)
+    voices = list(get_voice_catalog(backend).filter(gender=gender,
+                                                    accent=accent, age=age))
+    if not voices:
+        raise ValueError(f"No {backend} voice matches gender={gender}, "
+                         f"accent={accent}, age={age}")
+    voice = random.choice(voices)
+    if input_json is not None:
+        return write_streamed_audio_file(output_dir, input_audio, input_json,
+                                         voice, id=id, cache_dir=cache_dir,
+                                         backend=backend)
+    return write_audio_file(output_dir, input_audio, voice, id=id,
+                            cache_dir=cache_dir, backend=backend)
 
 
-def main(output_dir, input_highlight, audio_path, id=""):
+def main(output_dir, input_highlight, audio_path, id="",
+         cache_dir=CONVERSION_CACHE_DIR, input_json=None, backend=BACKEND):
     """
     Takes an input Conversation Highlight and returns a new Conversation
     Highlight that is converted from the original
@@ -106,26 +620,39 @@ def main(output_dir, input_highlight, audio_path, id=""):
         input_highlight (ConversationHighlight): input highight to be converted
         audio_path (String): path to mp3 file of the highlight to be converted
         to numpy ndarray
+        cache_dir (Path): directory of the conversion cache, None to disable
+        input_json (String): path to .json file of the highlight, if given
+        long recordings are converted in chunks
+        backend (String): name of a registered conversion backend, e.g.
+        "elevenlabs" or the offline "local" engine
 
     Returns:
         output_highlight (ConversationHighlight): converted Conversation
         Highlight transformed is set to True
-        og_hr (original highlight record) is set to the input highlight
+        og_hr (original highlight record) is set to the input highlight,
+        the converted audio is only loaded (memory mapped) when accessed
+    Raises:
+        RuntimeError: if the conversion failed
     """
-    converted_audio = write_output_voice(output_dir, audio_path, id=id)
-    numpy_array = mp3_to_ndarray(converted_audio, 16000)
+    converted_audio = write_output_voice(output_dir, audio_path, id=id,
+                                         cache_dir=cache_dir,
+                                         input_json=input_json,
+                                         backend=backend)
+    if converted_audio is None:
+        raise RuntimeError(f"converting {audio_path} failed")
     output_highlight = ConversationHighlight(
         share_location=None,
         share_text=None,
         transformed=True,
         auto_gen=False,
         transcript=input_highlight.transcript,
-        audio=numpy_array,
+        audio=LazyAudio(converted_audio, 16000),
         conv_rec=None,
         sharer_iden=None,
         og_hr=input_highlight,
         primary_speaker_iden=None,
         add_speaker_iden=None,
-        tags=input_highlight.tags
+        tags=input_highlight.tags,
+        words=input_highlight.words
     )
     return output_highlight